@@ -1,15 +1,28 @@
 # app/api/dependencies.py
-from typing import Generator
+from typing import AsyncGenerator, Generator, Optional, Tuple
 from sqlalchemy.orm import Session as SQLAlchemySession
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import (
     SessionLocal,
+    AsyncSessionLocal,
     engine as db_engine,
 )  # import engine for health check
+from sqlalchemy import text
 from fastapi import HTTPException, status
+from app.core.config import settings
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Cached (checked_at, healthy) result of the last database health check.
+# It is refreshed by db_health_probe_loop() in the background, so /health only reads it.
+# If the probe loop is not running (e.g. startup events skipped), get_db_health falls back
+# to checking inline at most every DB_HEALTH_CACHE_TTL_SECONDS.
+DB_HEALTH_CACHE_TTL_SECONDS = 5.0
+_db_health_cache: Optional[Tuple[float, bool]] = None
+
 
 def get_db() -> Generator[SQLAlchemySession, None, None]:
     if SessionLocal is None:
@@ -29,21 +42,62 @@ def get_db() -> Generator[SQLAlchemySession, None, None]:
         db.close()
 
 
-# Example of a database health check dependency
-async def get_db_health() -> bool:
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    if AsyncSessionLocal is None:
+        logger.error(
+            "Async database session (AsyncSessionLocal) is not initialized. Cannot get DB session."
+        )
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database service is not available.",
+        )
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def _check_db_connection() -> bool:
     if db_engine is None:
         logger.error("Database engine is not initialized.")
         return False
     try:
         with db_engine.connect() as connection:
-            # You can execute a simple query like "SELECT 1"
-            # connection.execute(text("SELECT 1"))
-            return True  # If connect() doesn't raise an exception, connection is likely okay
+            connection.execute(text("SELECT 1"))
+            return True
     except Exception as e:
         logger.error(f"Database health check failed: {e}", exc_info=True)
         return False
 
 
+async def db_health_probe_loop(interval_seconds: float):
+    """
+    Background task started at API startup: runs SELECT 1 every `interval_seconds`
+    in a worker thread and stores the result for get_db_health to read.
+    """
+    global _db_health_cache
+    logger.info(f"Starting database health probe (every {interval_seconds}s).")
+    while True:
+        healthy = await asyncio.to_thread(_check_db_connection)
+        _db_health_cache = (time.monotonic(), healthy)
+        await asyncio.sleep(interval_seconds)
+
+
+# Database health check dependency. Reads the probe result instead of checking out
+# a pooled connection per request, so probe floods don't contend with request handlers.
+async def get_db_health() -> bool:
+    global _db_health_cache
+    now = time.monotonic()
+    max_age = max(
+        DB_HEALTH_CACHE_TTL_SECONDS, 2 * settings.DB_HEALTH_CHECK_INTERVAL_SECONDS
+    )
+    if _db_health_cache is not None and now - _db_health_cache[0] <= max_age:
+        return _db_health_cache[1]
+
+    # No recent probe result: check inline once and cache it.
+    healthy = await asyncio.to_thread(_check_db_connection)
+    _db_health_cache = (time.monotonic(), healthy)
+    return healthy
+
+
 # Placeholder for rate limiting dependency using slowapi if you implement it
 # from slowapi import Limiter
 # from slowapi.util import get_remote_address
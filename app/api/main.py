@@ -1,16 +1,21 @@
 # app/api/main.py
 from fastapi import FastAPI, Request, status, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware  # For CORS
 from app.core.config import settings
 from app.core.logging_config import setup_logging, CustomJsonFormatter
 from app.api.routers import ask as ask_router
-from app.api.dependencies import get_db_health  # For health check
-from app.db.session import engine as db_engine, Base as db_base  # For creating tables
+from app.api.middleware import RequestLoggingMiddleware, BodySizeLimitMiddleware
+from app.api.dependencies import get_db_health, db_health_probe_loop  # For health check
+from app.db.session import engine as db_engine, async_engine as db_async_engine
+from app.models import Base as db_base  # For creating tables (registers all models)
+from app.services.cache_client import get_response_cache
 from prometheus_fastapi_instrumentator import Instrumentator  # For Prometheus
+import anyio
+import asyncio
 import logging
-import time  # For request timing example
 
 # Call setup_logging() early, before creating FastAPI app or importing other modules that log
 setup_logging()
@@ -32,12 +37,9 @@ def create_db_tables():
         # Depending on the setup, you might want to exit or raise a critical error.
 
 
-# Call it at startup. In a more complex setup, this might be a startup event.
-create_db_tables()
-
-
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    default_response_class=ORJSONResponse,  # orjson instead of stdlib json for all JSON responses
     openapi_url=f"/api/v1/openapi.json",  # Customize OpenAPI URL
     # docs_url="/api/docs",  # Default is /docs
     # redoc_url="/api/redoc" # Default is /redoc
@@ -57,7 +59,7 @@ if settings.PROMETHEUS_ENABLED:
 if settings.BACKEND_CORS_ORIGINS:
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=[str(origin) for origin in settings.BACKEND_CORS_ORIGINS],
+        allow_origins=settings.BACKEND_CORS_ORIGINS,  # Already a validated List[str]
         allow_credentials=True,
         allow_methods=["*"],  # Allows all methods
         allow_headers=["*"],  # Allows all headers
@@ -65,51 +67,40 @@ if settings.BACKEND_CORS_ORIGINS:
     logger.info(f"CORS middleware enabled for origins: {settings.BACKEND_CORS_ORIGINS}")
 
 
-# --- Custom Request Logging Middleware (Example) ---
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    # Log request details before processing
-    # logger.info(f"Incoming request: {request.method} {request.url.path}", extra={"client_host": request.client.host})
-
-    response = await call_next(request)
-
-    process_time = (time.time() - start_time) * 1000  # milliseconds
-    formatted_process_time = "{0:.2f}".format(process_time)
+# --- Request Body Size Limit ---
+# Rejects oversized bodies (by Content-Length) with a 413 before they are read and parsed.
+app.add_middleware(
+    BodySizeLimitMiddleware, max_body_bytes=settings.MAX_REQUEST_BODY_BYTES
+)
 
-    # Log response details after processing
-    # Using a custom log record structure for JSON logger
-    log_extra = {
-        "client_host": request.client.host,
-        "request_method": request.method,
-        "request_path": request.url.path,
-        "response_status_code": response.status_code,
-        "response_process_time_ms": formatted_process_time,
-    }
-    logger.info(
-        f"Request {request.method} {request.url.path} completed with status {response.status_code}",
-        extra=log_extra,
-    )
 
-    return response
+# --- Custom Request Logging Middleware ---
+# Pure ASGI middleware (see app/api/middleware.py); avoids BaseHTTPMiddleware overhead per request.
+# Added last so it is outermost and also logs requests rejected by the middleware above.
+app.add_middleware(RequestLoggingMiddleware)
 
 
 # --- Custom Exception Handlers ---
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    # Build the error list once and reuse it for the log and the response body.
+    # jsonable_encoder turns non-JSON values (e.g. the ValueError in an error's "ctx")
+    # into strings, which orjson would otherwise reject.
+    errors = jsonable_encoder(exc.errors())
     # Log the validation error in more detail
-    logger.warning(
-        f"Request validation error: {exc.errors()}",
-        extra={
-            "client_host": request.client.host,
-            "request_path": request.url.path,
-            "detail": exc.errors(),
-        },
-    )
-    return JSONResponse(
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning(
+            f"Request validation error: {errors}",
+            extra={
+                "client_host": request.client.host,
+                "request_path": request.url.path,
+                "detail": errors,
+            },
+        )
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
-            "detail": exc.errors(),
+            "detail": errors,
             "message": "Validation failed for one or more fields.",
         },
     )
@@ -118,16 +109,17 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     # Log HTTP exceptions
-    logger.error(
-        f"HTTP exception: {exc.status_code} - {exc.detail}",
-        extra={
-            "client_host": request.client.host,
-            "request_path": request.url.path,
-            "status_code": exc.status_code,
-            "detail": exc.detail,
-        },
-    )
-    return JSONResponse(
+    if logger.isEnabledFor(logging.ERROR):
+        logger.error(
+            f"HTTP exception: {exc.status_code} - {exc.detail}",
+            extra={
+                "client_host": request.client.host,
+                "request_path": request.url.path,
+                "status_code": exc.status_code,
+                "detail": exc.detail,
+            },
+        )
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
         headers=exc.headers,
@@ -141,7 +133,7 @@ async def generic_exception_handler(request: Request, exc: Exception):
         exc_info=True,  # Include stack trace
         extra={"client_host": request.client.host, "request_path": request.url.path},
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": "An unexpected internal server error occurred."},
     )
@@ -163,7 +155,7 @@ async def health_check(db_healthy: bool = Depends(get_db_health)):
         logger.warning("Health check: Database service is unhealthy.")
         # Return 503 if critical dependencies are down
         # raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail={"api": api_status, "services": services})
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             content={"api_status": api_status, "services": services},
         )
@@ -173,21 +165,37 @@ async def health_check(db_healthy: bool = Depends(get_db_health)):
 
 
 # --- Startup and Shutdown Events (Optional) ---
+_db_health_probe_task = None
+
+
 @app.on_event("startup")
 async def startup_event():
+    global _db_health_probe_task
     logger.info("FastAPI application startup commencing...")
     # Example: Initialize ML models if not done elsewhere, connect to services
-    # Note: DB tables are created above, outside of event for simplicity here
+    if settings.AUTO_CREATE_TABLES:
+        # create_all() does a blocking round-trip per table; keep it off the event loop
+        # and out of module import so worker processes don't serialize on it.
+        await anyio.to_thread.run_sync(create_db_tables)
+    _db_health_probe_task = asyncio.create_task(
+        db_health_probe_loop(settings.DB_HEALTH_CHECK_INTERVAL_SECONDS)
+    )
     logger.info("FastAPI application started successfully.")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("FastAPI application shutdown commencing...")
+    if _db_health_probe_task:
+        _db_health_probe_task.cancel()
     # Example: Clean up resources, close connections
     if db_engine:
         db_engine.dispose()  # Close all database connections in the pool
         logger.info("Database engine connections disposed.")
+    if db_async_engine:
+        await db_async_engine.dispose()
+        logger.info("Async database engine connections disposed.")
+    await get_response_cache().close()
     logger.info("FastAPI application shutdown completed.")
 
 
@@ -203,6 +211,9 @@ if __name__ == "__main__":
         "main:app",  # Points to this file (main.py) and the app object
         host=settings.API_HOST,
         port=settings.API_PORT,
+        loop="uvloop",  # Faster event loop than asyncio's default (from uvicorn[standard])
+        http="httptools",  # C-based HTTP parser instead of h11
         log_level=settings.LOG_LEVEL.lower(),  # Uvicorn expects lowercase log level
-        reload=True,  # Enable reload for development
+        workers=settings.UVICORN_WORKERS,  # Ignored by uvicorn when reload is on
+        reload=settings.DEBUG,  # Enable reload for development
     )
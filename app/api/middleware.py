@@ -0,0 +1,91 @@
+# app/api/middleware.py
+# Pure ASGI middleware. These deliberately avoid Starlette's BaseHTTPMiddleware
+# (used by @app.middleware("http")), which spawns an extra task and builds
+# Request/Response objects on every call.
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Probe/scrape endpoints hit many times per second; skip timing and logging for them.
+_EXCLUDED_PATHS = frozenset({"/health", "/metrics"})
+
+
+class RequestLoggingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"] in _EXCLUDED_PATHS
+            or not logger.isEnabledFor(logging.INFO)  # Nothing would be logged; skip the timing work
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        response_info = {"status_code": 500, "process_time_ms": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response_info["status_code"] = message["status"]
+                response_info["process_time_ms"] = (time.perf_counter() - start) * 1000
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+        process_time = response_info["process_time_ms"]
+        if process_time is None:  # No response was started (e.g. client disconnected)
+            process_time = (time.perf_counter() - start) * 1000
+        formatted_process_time = "{0:.2f}".format(process_time)
+
+        client = scope.get("client")
+        status_code = response_info["status_code"]
+        # Using a custom log record structure for JSON logger
+        log_extra = {
+            "client_host": client[0] if client else None,
+            "request_method": scope["method"],
+            "request_path": scope["path"],
+            "response_status_code": status_code,
+            "response_process_time_ms": formatted_process_time,
+        }
+        logger.info(
+            f"Request {scope['method']} {scope['path']} completed with status {status_code}",
+            extra=log_extra,
+        )
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects requests whose declared Content-Length exceeds max_body_bytes with a 413,
+    before Starlette reads the body or Pydantic parses it.
+    """
+
+    def __init__(self, app, max_body_bytes: int):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    if value.isdigit() and int(value) > self.max_body_bytes:
+                        await self._reject(send)
+                        return
+                    break
+        await self.app(scope, receive, send)
+
+    async def _reject(self, send):
+        body = b'{"detail":"Request body too large."}'
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
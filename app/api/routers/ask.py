@@ -1,16 +1,22 @@
 # app/api/routers/ask.py
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, status
-from sqlalchemy.orm import Session
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import schemas  # Renamed to avoid conflict
 from app.models.job import Job, JobStatus
 from app.worker.celery_app import celery_app  # To access task signature
 
 # It's better to import the task directly if possible, or define a helper in celery_app
 # from app.worker.tasks import process_question_task # Assuming this task is defined
-from app.api.dependencies import get_db
+from app.api.dependencies import get_async_db
+from app.db.session import SessionLocal
+from app.services.cache_client import get_response_cache
 from app.core.config import settings
+import anyio
 import logging
-import shortuuid  # For job IDs
+import secrets  # For job IDs
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -21,18 +27,53 @@ router = APIRouter(
 )
 
 
+def _mark_job_enqueue_failed(job_id: str):
+    """Marks a job FAILED when it could not be queued, so it isn't left PENDING forever."""
+    if SessionLocal is None:
+        return
+    db = SessionLocal()
+    try:
+        db_job = db.get(Job, job_id)
+        if db_job:
+            db_job.status = JobStatus.FAILED
+            db_job.result_text = "Failed to queue the question for processing."
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(
+            f"Failed to mark job {job_id} as FAILED after enqueue error: {e}",
+            exc_info=True,
+            extra={"job_id": job_id},
+        )
+    finally:
+        db.close()
+
+
 # This is a placeholder for the actual Celery task.
 # In a real setup, you'd import the task itself from app.worker.tasks
 # For example: from app.worker.tasks import process_question_task
-# Here, we use send_task which is more generic but requires knowing the task name.
+# Here, we use a signature by name, which is more generic but requires knowing the task name.
+# Ensure the task name matches what's registered in Celery
+# The name is often 'app.worker.tasks.process_question_task'
+# Or the custom name if specified in @celery_app.task(name="custom_task_name")
+PROCESS_QUESTION_TASK_NAME = "app.worker.tasks.process_question_task"
+# Built once; apply_async() on it is equivalent to send_task() with this name
+_process_question_sig = celery_app.signature(PROCESS_QUESTION_TASK_NAME)
+
+
 def enqueue_processing_task(job_id: str, question: str):
-    """Helper to enqueue the Celery task."""
+    """
+    Helper to enqueue the Celery task. Runs as a background task after the job row is
+    committed and the 202 response is sent, so the worker can never see an uncommitted job
+    and the request doesn't wait on the broker round-trip.
+    """
     try:
-        # Ensure the task name matches what's registered in Celery
-        # The name is often 'app.worker.tasks.process_question_task'
-        # Or the custom name if specified in @celery_app.task(name="custom_task_name")
-        task_name = "app.worker.tasks.process_question_task"  # Adjust if your task name is different
-        celery_app.send_task(task_name, args=[job_id, question], task_id=job_id)
+        # Publish on a producer from the app's pool so the broker connection (and its
+        # channel) is reused across requests instead of being set up per publish.
+        with celery_app.producer_pool.acquire(block=True) as producer:
+            _process_question_sig.apply_async(
+                args=[job_id, question], task_id=job_id, producer=producer
+            )
         logger.info(
             f"Job {job_id} enqueued for processing question: '{question[:50]}...'",
             extra={"job_id": job_id},
@@ -43,12 +84,9 @@ def enqueue_processing_task(job_id: str, question: str):
             exc_info=True,
             extra={"job_id": job_id},
         )
-        # This is a critical failure. The job entry in DB might need to be marked as FAILED immediately,
-        # or a retry mechanism for enqueueing could be considered.
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to queue the question for processing. Please try again later.",
-        )
+        # The response has already been sent, so record the failure on the job instead
+        # of leaving an orphaned PENDING row. Clients see it as FAILED when polling.
+        _mark_job_enqueue_failed(job_id)
 
 
 @router.post(
@@ -56,31 +94,31 @@ def enqueue_processing_task(job_id: str, question: str):
 )
 async def ask_question(
     request: schemas.AskRequest,
-    db: Session = Depends(get_db),
-    # background_tasks: BackgroundTasks # Not typically used with Celery for the main task
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_async_db),
 ):
     """
     Accepts a technical question, queues it for asynchronous processing,
     and returns a job ID.
     """
-    job_id = shortuuid.uuid()  # Generate a unique job ID
+    job_id = secrets.token_urlsafe(16)  # Generate a unique, URL-safe job ID (22 chars)
     logger.info(
         f"Received question for new job {job_id}: '{request.question[:50]}...'",
         extra={"job_id": job_id},
     )
 
-    # 1. Create job entry in the database
+    # 1. Create job entry in the database (async, so the event loop isn't blocked on the DB round-trip)
     db_job = Job(id=job_id, question=request.question, status=JobStatus.PENDING)
     try:
-        db.add(db_job)
-        db.commit()
-        db.refresh(db_job)
+        async with session.begin():  # Commits on exit, rolls back on error
+            session.add(db_job)
+        # No refresh: the response only needs the id and PENDING status, both known here,
+        # so skip the extra SELECT for the server-side timestamp defaults.
         logger.info(
             f"Job {job_id} created in database with status PENDING.",
             extra={"job_id": job_id},
         )
     except Exception as e:
-        db.rollback()
         logger.error(
             f"Database error creating job {job_id}: {e}",
             exc_info=True,
@@ -91,49 +129,130 @@ async def ask_question(
             detail="Failed to record the job. Please try again.",
         )
 
-    # 2. Enqueue task for Celery worker
-    # This should be robust. If enqueueing fails, the job is in DB but won't be processed.
-    # Consider strategies for this (e.g., a separate monitoring process for orphaned jobs).
-    enqueue_processing_task(job_id=db_job.id, question=db_job.question)
+    # 2. Enqueue task for Celery worker once the response has been sent (post-commit).
+    # If enqueueing fails, enqueue_processing_task marks the job FAILED.
+    background_tasks.add_task(
+        enqueue_processing_task, job_id=job_id, question=request.question
+    )
+
+    return schemas.JobCreateResponse(job_id=job_id, status=JobStatus.PENDING)
+
+
+# Columns returned by GET /ask/{job_id}, and a prebuilt validator/serializer for its body
+_JOB_RESULT_COLUMNS = (
+    Job.id,
+    Job.question,
+    Job.status,
+    Job.created_at,
+    Job.updated_at,
+    Job.result_text,
+    Job.sources_metadata,
+)
+_job_result_adapter = TypeAdapter(schemas.JobResultResponse)
+
+# Celery states meaning a worker has picked the task up: STARTED (task_track_started)
+# and PROGRESS (published while a partial answer streams).
+_CELERY_ACTIVE_STATES = frozenset({"STARTED", "PROGRESS"})
+
+
+async def _effective_status(job_id: str, db_status: JobStatus) -> JobStatus:
+    """
+    The worker only writes terminal statuses to the DB, so a PENDING row may already be
+    running. Reports PROCESSING in that case, based on the Celery result backend.
+    """
+    if db_status != JobStatus.PENDING:
+        return db_status
+    try:
+        # AsyncResult.state is a blocking Redis GET; keep it off the event loop
+        celery_state = await anyio.to_thread.run_sync(
+            lambda: celery_app.AsyncResult(job_id).state
+        )
+    except Exception as e:
+        logger.warning(
+            f"Could not read Celery state for job {job_id}: {e}", extra={"job_id": job_id}
+        )
+        return db_status
+    if celery_state in _CELERY_ACTIVE_STATES:
+        return JobStatus.PROCESSING
+    return db_status
+
 
-    return schemas.JobCreateResponse(job_id=db_job.id, status=db_job.status)
+@router.get("/{job_id}/status", response_model=schemas.JobStatusResponse)
+async def get_job_status(job_id: str, session: AsyncSession = Depends(get_async_db)):
+    """
+    Lightweight polling endpoint: returns only the job's status and last update time.
+    Skips the (potentially large) result_text and sources_metadata columns, so clients
+    can poll this and fetch GET /ask/{job_id} once the job is COMPLETED/FAILED.
+    """
+    result = await session.execute(
+        select(Job.status, Job.updated_at).where(Job.id == job_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        logger.warning(f"Job {job_id} not found in database.", extra={"job_id": job_id})
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found."
+        )
+    return schemas.JobStatusResponse(
+        id=job_id,
+        status=await _effective_status(job_id, row.status),
+        updated_at=row.updated_at,
+    )
 
 
 @router.get("/{job_id}", response_model=schemas.JobResultResponse)
-async def get_job_status_and_result(job_id: str, db: Session = Depends(get_db)):
+async def get_job_status_and_result(
+    job_id: str, session: AsyncSession = Depends(get_async_db)
+):
     """
     Retrieves the status and result (if available) of a previously submitted job.
+    Responses are cached in Redis: for an hour once the job is COMPLETED (it never changes
+    after that), briefly otherwise. FAILED is not final: the worker writes it before a
+    Celery retry, which can still complete the job.
     """
     logger.debug(f"Fetching status for job {job_id}", extra={"job_id": job_id})
 
-    db_job = db.query(Job).filter(Job.id == job_id).first()
+    cache = get_response_cache()
+    cache_key = f"job:{job_id}"
+    cached_body = await cache.get(cache_key)
+    if cached_body is not None:
+        return Response(content=cached_body, media_type="application/json")
 
-    if not db_job:
+    # Read-only: select plain columns as a row mapping; no ORM object/identity map needed.
+    result = await session.execute(
+        select(*_JOB_RESULT_COLUMNS).where(Job.id == job_id)
+    )
+    row = result.mappings().one_or_none()
+
+    if row is None:
         logger.warning(f"Job {job_id} not found in database.", extra={"job_id": job_id})
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Job not found."
         )
 
+    job_status = await _effective_status(job_id, row["status"])
     logger.info(
-        f"Job {job_id} found with status: {db_job.status}", extra={"job_id": job_id}
+        f"Job {job_id} found with status: {job_status}", extra={"job_id": job_id}
     )
 
     # Calculate processing time if job is completed or failed and has timestamps
     processing_time = None
-    if db_job.status in [JobStatus.COMPLETED, JobStatus.FAILED]:
+    if job_status in (JobStatus.COMPLETED, JobStatus.FAILED):
         if (
-            db_job.created_at and db_job.updated_at
+            row["created_at"] and row["updated_at"]
         ):  # updated_at reflects completion/failure time
-            time_delta = db_job.updated_at - db_job.created_at
+            time_delta = row["updated_at"] - row["created_at"]
             processing_time = round(time_delta.total_seconds(), 2)
 
-    return schemas.JobResultResponse(
-        id=db_job.id,
-        question=db_job.question,
-        status=db_job.status,
-        created_at=db_job.created_at,
-        updated_at=db_job.updated_at,
-        result_text=db_job.result_text,
-        sources_metadata=db_job.sources_metadata,  # Assumes this is already in the desired format
-        processing_time_seconds=processing_time,
+    response = _job_result_adapter.validate_python(
+        {**row, "status": job_status, "processing_time_seconds": processing_time}
     )
+
+    # Serialize once; the same bytes are cached and returned.
+    body = _job_result_adapter.dump_json(response)
+    if job_status == JobStatus.COMPLETED:
+        ttl = settings.RESPONSE_CACHE_TTL_TERMINAL_SECONDS
+    else:
+        ttl = settings.RESPONSE_CACHE_TTL_ACTIVE_SECONDS
+    await cache.set(cache_key, body, ttl)
+    return Response(content=body, media_type="application/json")
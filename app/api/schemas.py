@@ -38,6 +38,14 @@ class JobCreateResponse(BaseModel):
     )
 
 
+class JobStatusResponse(BaseModel):
+    id: str = Field(description="Unique identifier for the job.")
+    status: JobStatus = Field(description="Current status of the job.")
+    updated_at: datetime.datetime = Field(
+        description="Timestamp when the job was last updated."
+    )
+
+
 class SourceDocument(BaseModel):
     source_id: Optional[str] = Field(
         None,
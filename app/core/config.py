@@ -1,94 +1,177 @@
 # app/core/config.py
-import os
-from dotenv import load_dotenv
-from pathlib import Path
-from typing import List, Optional
+from functools import lru_cache
+from typing import Annotated, List, Optional
 
-# Load .env file from the project root
-env_path = Path(".") / ".env"
-load_dotenv(dotenv_path=env_path)
+from pydantic import field_validator, model_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 
-class Settings:
-    PROJECT_NAME: str = os.getenv("PROJECT_NAME", "Technical Knowledge Assistant")
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
-    API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
-    API_PORT: int = int(os.getenv("API_PORT", "8080"))
+class Settings(BaseSettings):
+    # Values are read from the environment (and the project-root .env file) and
+    # validated once, when the cached instance is first built (see get_settings()).
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    PROJECT_NAME: str = "Technical Knowledge Assistant"
+    LOG_LEVEL: str = "INFO"
+    API_HOST: str = "0.0.0.0"
+    API_PORT: int = 8080
+    DEBUG: bool = False  # Enables uvicorn auto-reload when running app/api/main.py directly
+    # Upper bound on request bodies (checked against Content-Length). AskRequest.question
+    # is at most 1000 chars, which JSON can encode in up to ~12 KB (\uXXXX escapes).
+    MAX_REQUEST_BODY_BYTES: int = 16384
+    # Uvicorn worker processes; (2 * CPU cores) + 1 is a common starting point in production
+    UVICORN_WORKERS: int = 1
 
     # Celery
-    CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
-    CELERY_RESULT_BACKEND: str = os.getenv(
-        "CELERY_RESULT_BACKEND", "redis://redis:6379/0"
-    )
+    CELERY_BROKER_URL: str = "redis://redis:6379/0"
+    CELERY_RESULT_BACKEND: str = "redis://redis:6379/0"
+    CELERY_BROKER_POOL_LIMIT: int = 10  # Max pooled broker connections per process
+    # Load and exercise the LLM/embedding models when each worker process starts
+    WORKER_WARMUP_ENABLED: bool = True
+
+    # Response cache for GET /ask/{job_id} (defaults to the Celery broker's Redis)
+    RESPONSE_CACHE_REDIS_URL: Optional[str] = None
+    RESPONSE_CACHE_TTL_ACTIVE_SECONDS: int = 1  # PENDING/PROCESSING/FAILED (may be retried)
+    RESPONSE_CACHE_TTL_TERMINAL_SECONDS: int = 3600  # COMPLETED
 
     # Database (PostgreSQL)
-    POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "postgres_db")
-    POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
-    POSTGRES_USER: str = os.getenv("POSTGRES_USER", "user")
-    POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "password")
-    POSTGRES_DB: str = os.getenv("POSTGRES_DB", "knowledge_assistant_db")
-
-    # Construct DATABASE_URL ensuring default values are used if specific parts are not in .env
-    # This prioritizes DATABASE_URL if it's explicitly set in .env
-    _db_user = POSTGRES_USER
-    _db_password = POSTGRES_PASSWORD
-    _db_server = POSTGRES_SERVER
-    _db_port = POSTGRES_PORT
-    _db_name = POSTGRES_DB
-
-    DATABASE_URL: str = os.getenv(
-        "DATABASE_URL",
-        f"postgresql://{_db_user}:{_db_password}@{_db_server}:{_db_port}/{_db_name}",
-    )
+    POSTGRES_SERVER: str = "postgres_db"
+    POSTGRES_PORT: str = "5432"
+    POSTGRES_USER: str = "user"
+    POSTGRES_PASSWORD: str = "password"
+    POSTGRES_DB: str = "knowledge_assistant_db"
+
+    # DATABASE_URL wins if it's explicitly set; otherwise it's constructed from the
+    # POSTGRES_* values above (see _derive_defaults).
+    DATABASE_URL: Optional[str] = None
+    # Connection pool sizing (per engine, per process)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE: int = 1800  # Seconds
+    DB_POOL_TIMEOUT: int = 30  # Seconds
+    # pre_ping costs a round-trip per checkout; can be disabled when DB_POOL_RECYCLE
+    # is below the server's idle-connection timeout.
+    DB_POOL_PRE_PING: bool = True
+    # Create tables with metadata.create_all() on API startup. Development convenience only;
+    # production schemas are managed with Alembic, so disable this there.
+    AUTO_CREATE_TABLES: bool = True
+    # Interval for the API's background database health probe (SELECT 1)
+    DB_HEALTH_CHECK_INTERVAL_SECONDS: float = 5.0
 
     # Vector Database
-    VECTOR_DB_IMPL: str = os.getenv(
-        "VECTOR_DB_IMPL", "chromadb"
-    )  # e.g., "chromadb", "faiss"
-    CHROMA_HOST: str = os.getenv("CHROMA_HOST", "vector_db")
-    CHROMA_PORT: int = int(os.getenv("CHROMA_PORT", "8000"))
-    CHROMA_COLLECTION_NAME: str = os.getenv(
-        "CHROMA_COLLECTION_NAME", "simple_wikipedia_chunks"
-    )
-    # FAISS_INDEX_PATH: Optional[str] = os.getenv("FAISS_INDEX_PATH")
-    # FAISS_METADATA_PATH: Optional[str] = os.getenv("FAISS_METADATA_PATH")
+    # "chromadb", "usearch" (in-process, single node) or "faiss" (in-process, bulk-loaded)
+    VECTOR_DB_IMPL: str = "chromadb"
+    CHROMA_HOST: str = "vector_db"
+    CHROMA_PORT: int = 8000
+    CHROMA_COLLECTION_NAME: str = "simple_wikipedia_chunks"
+    # USearch index file and its SQLite sidecar for chunk text/metadata (VECTOR_DB_IMPL=usearch)
+    USEARCH_INDEX_PATH: str = "./vector_db_data/usearch.index"
+    USEARCH_STORE_PATH: str = "./vector_db_data/documents.sqlite3"
+    # FAISS index file and its SQLite sidecar for chunk text/metadata (VECTOR_DB_IMPL=faiss)
+    FAISS_INDEX_PATH: str = "./vector_db_data/faiss.index"
+    FAISS_METADATA_PATH: str = "./vector_db_data/faiss_documents.sqlite3"
 
     # LLM and Embeddings
-    LLM_MODEL_NAME: str = os.getenv(
-        "LLM_MODEL_NAME", "mistralai/Mistral-7B-Instruct-v0.1"
-    )
-    LLM_MODEL_PATH: Optional[str] = os.getenv(
-        "LLM_MODEL_PATH"
-    )  # For locally stored models
-    EMBEDDING_MODEL_NAME: str = os.getenv(
-        "EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2"
-    )
+    LLM_MODEL_NAME: str = "mistralai/Mistral-7B-Instruct-v0.1"
+    LLM_MODEL_PATH: Optional[str] = None  # For locally stored models
+    # Load LLM weights quantized with bitsandbytes: "none", "8bit" or "4bit" (NF4).
+    # CUDA only (ignored on CPU); works with device_map="auto". Requires bitsandbytes.
+    LLM_QUANTIZATION: str = "none"
+    # Preallocated (static) KV cache with bucketed prompt/decode lengths; CUDA only.
+    # Mainly useful together with a compiled model, whose CUDA graphs need fixed shapes.
+    LLM_STATIC_KV_CACHE: bool = False
+    # torch.compile(mode="reduce-overhead") the LLM forward on CUDA (compiled at startup;
+    # only together with LLM_STATIC_KV_CACHE, ignored with LLM_QUANTIZATION)
+    LLM_TORCH_COMPILE: bool = False
+    # Reuse one precomputed KV cache for the fixed instruction prefix of every RAG prompt
+    LLM_PREFIX_CACHE_ENABLED: bool = True
+    # Greedy decoding for answers; set to false to sample (temperature 0.1, top_p 0.9)
+    LLM_DETERMINISTIC: bool = True
+    # Stream tokens while generating and publish the partial answer as the Celery task's
+    # PROGRESS state, throttled to one update per interval
+    LLM_STREAM_PARTIAL_ANSWERS: bool = True
+    PARTIAL_ANSWER_UPDATE_INTERVAL_SECONDS: float = 0.5
+    # Also publish every generated text delta on Redis pub/sub channel job:{job_id}:stream
+    ANSWER_STREAM_PUBSUB_ENABLED: bool = False
+    EMBEDDING_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE: int = 64  # encode() batch size when embedding documents
+    EMBEDDING_BATCH_SIZE_GPU: int = 256  # Same on CUDA, where the model runs in FP16
+    # torch.compile the embedding transformer (slower startup, faster encode on long runs)
+    USE_COMPILED_EMBED: bool = False
 
     # Data Ingestion
-    DATASET_NAME: str = os.getenv("DATASET_NAME", "rahular/simple-wikipedia")
-    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", 512))
-    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", 64))
+    DATASET_NAME: str = "rahular/simple-wikipedia"
+    CHUNK_SIZE: int = 512
+    CHUNK_OVERLAP: int = 64
+    # torch intra-op threads for CPU embedding during ingestion; unset = about one per
+    # physical core (os.cpu_count() // 2), since hyperthreads only add contention
+    INGEST_TORCH_THREADS: Optional[int] = None
 
     # Retrieval
-    RETRIEVAL_TOP_K: int = int(os.getenv("RETRIEVAL_TOP_K", 5))
+    RETRIEVAL_TOP_K: int = 5
+    # Reciprocal Rank Fusion constant; larger values flatten the gap between top ranks
+    RRF_K: int = 60
+    # Stored as the answer when retrieval finds no passages (the LLM is not called)
+    NO_CONTEXT_ANSWER: str = (
+        "I couldn't find relevant information to answer this question."
+    )
+    # Per-worker LRU+TTL cache of retrieval results, keyed by normalized question
+    QUERY_CACHE_ENABLED: bool = True
+    QUERY_CACHE_MAX_SIZE: int = 2000
+    QUERY_CACHE_TTL_SECONDS: float = 300.0
+    # Concurrent vector DB queries per process_question_batch_task
+    RETRIEVAL_BATCH_THREADS: int = 4
+    # Per-worker LRU of query embeddings (skips the encoder for repeated questions).
+    # Disable when questions rarely repeat, to skip the lookup entirely.
+    QUERY_EMBEDDING_CACHE_ENABLED: bool = True
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2048
 
     # Hugging Face Hub Token
-    HUGGING_FACE_HUB_TOKEN: Optional[str] = os.getenv("HUGGING_FACE_HUB_TOKEN")
+    HUGGING_FACE_HUB_TOKEN: Optional[str] = None
 
     # Prometheus / Monitoring
-    PROMETHEUS_ENABLED: bool = os.getenv("PROMETHEUS_ENABLED", "true").lower() == "true"
+    PROMETHEUS_ENABLED: bool = True
 
     # Rate Limiting (example, adjust as needed)
-    RATE_LIMIT_TIMES: int = int(os.getenv("RATE_LIMIT_TIMES", "100"))
-    RATE_LIMIT_SECONDS: int = int(os.getenv("RATE_LIMIT_SECONDS", "60"))  # Per minute
-
-    # CORS Origins (for FastAPI) - example
-    BACKEND_CORS_ORIGINS: List[str] = [
-        origin.strip() for origin in os.getenv("BACKEND_CORS_ORIGINS", "*").split(",")
-    ]
-
-
-settings = Settings()
+    RATE_LIMIT_TIMES: int = 100
+    RATE_LIMIT_SECONDS: int = 60  # Per minute
+
+    # CORS Origins (for FastAPI) - comma-separated in the environment, e.g. "http://a,http://b"
+    # NoDecode: take the raw string instead of expecting a JSON list.
+    BACKEND_CORS_ORIGINS: Annotated[List[str], NoDecode] = ["*"]
+
+    @field_validator("LOG_LEVEL")
+    @classmethod
+    def _upper_log_level(cls, v: str) -> str:
+        return v.upper()
+
+    @field_validator("BACKEND_CORS_ORIGINS", mode="before")
+    @classmethod
+    def _split_cors_origins(cls, v):
+        if isinstance(v, str):
+            return [origin.strip() for origin in v.split(",") if origin.strip()]
+        return v
+
+    @model_validator(mode="after")
+    def _derive_defaults(self) -> "Settings":
+        if not self.DATABASE_URL:
+            self.DATABASE_URL = (
+                f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+                f"@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+            )
+        if not self.RESPONSE_CACHE_REDIS_URL:
+            # Defaults to the Celery broker's Redis
+            self.RESPONSE_CACHE_REDIS_URL = self.CELERY_BROKER_URL
+        return self
+
+
+@lru_cache()
+def get_settings() -> Settings:
+    # Parsed and validated once per process; usable as a FastAPI dependency too
+    return Settings()
+
+
+settings = get_settings()
 
 # You can add more specific settings classes if needed, e.g., for different environments
 # class DevelopmentSettings(Settings):
@@ -1,58 +1,151 @@
 # app/core/logging_config.py
+import copy
 import logging
+import logging.config
+import logging.handlers
+import os
+import queue
 import sys
-from pythonjsonlogger import jsonlogger
+import atexit
+from typing import Optional
+import orjson
 from app.core.config import settings
 
+# Attributes every LogRecord has; anything else on a record came in via `extra=`.
+_RESERVED_RECORD_ATTRS = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "taskName"}
 
-class CustomJsonFormatter(jsonlogger.JsonFormatter):
-    def add_fields(self, log_record, record, message_dict):
-        super(CustomJsonFormatter, self).add_fields(log_record, record, message_dict)
-        if not log_record.get("timestamp"):
-            log_record["timestamp"] = record.created
-        if log_record.get("level"):
-            log_record["level"] = log_record["level"].upper()
-        else:
-            log_record["level"] = record.levelname
 
-        # Add context from record if available (e.g., job_id)
-        if hasattr(record, "job_id") and record.job_id is not None:
-            log_record["job_id"] = record.job_id
+class CustomJsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line using orjson."""
+
+    def format(self, record):
+        log_record = {
+            "timestamp": record.created,
+            "level": record.levelname,
+            "name": record.name,
+            "module": record.module,
+            "funcName": record.funcName,
+            "lineno": record.lineno,
+            "message": record.getMessage(),
+            # Add context from record if available (e.g., job_id)
+            "job_id": getattr(record, "job_id", None),
+        }
+        # Fields passed via `extra=` (client_host, request_path, ...)
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_RECORD_ATTRS and key not in log_record:
+                log_record[key] = value
+
+        if record.exc_info:
+            log_record["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_record["exc_info"] = record.exc_text
+        if record.stack_info:
+            log_record["stack_info"] = self.formatStack(record.stack_info)
+
+        return orjson.dumps(log_record, default=str).decode()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Resolves the message on the calling thread (args may change later) but, unlike the
+    stdlib prepare(), keeps the traceback separate so the JSON formatter can emit it
+    as its own field instead of appending it to the message.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# Background listener that formats records and writes them to stdout, so the
+# calling (event loop / task) thread only pays for an in-memory enqueue.
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _stop_queue_listener():
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()  # Flushes any queued records
+        _queue_listener = None
+
+
+def _restart_queue_listener_after_fork():
+    # Threads don't survive fork (e.g. Celery prefork pool); start a fresh listener thread in the child.
+    if _queue_listener is not None:
+        _queue_listener._thread = None
+        _queue_listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_queue_listener_after_fork)
+atexit.register(_stop_queue_listener)
+
+
+def _build_queue_handler():
+    """
+    dictConfig handler factory: (re)starts the listener thread that owns the stdout
+    JSON handler and returns the queue handler that feeds it.
+    """
+    global _queue_listener
+    _stop_queue_listener()
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(CustomJsonFormatter())
+    log_queue = queue.SimpleQueue()
+    _queue_listener = logging.handlers.QueueListener(
+        log_queue, console_handler, respect_handler_level=True
+    )
+    _queue_listener.start()
+    return _QueueHandler(log_queue)
+
+
+# Per-library overrides; None means "use the configured LOG_LEVEL".
+_LIBRARY_LOG_LEVELS = {
+    "uvicorn.access": logging.WARNING,  # Quieten access logs unless error
+    "uvicorn.error": None,
+    "celery": None,
+    "sqlalchemy.engine": logging.WARNING,  # Set to INFO for query logging
+    "httpx": logging.WARNING,
+    "chromadb.telemetry.posthog": logging.WARNING,  # Silence ChromaDB telemetry logs
+}
 
 
 def setup_logging():
+    # Both the API (main.py) and the worker (celery_app.py) call this, and a process
+    # may import both; configure once per process. Forked children inherit the config
+    # (the listener thread is restarted by the at-fork hook above).
+    if getattr(setup_logging, "_inited", False):
+        return
+
     log_level = settings.LOG_LEVEL.upper()
     numeric_level = getattr(logging, log_level, logging.INFO)
 
-    # Root logger configuration
-    root_logger = logging.getLogger()
-    root_logger.setLevel(numeric_level)
+    # Root logger: replaces any existing root handlers in one step. Loggers created
+    # by already-imported modules are left enabled.
+    logging.config.dictConfig(
+        {
+            "version": 1,
+            "disable_existing_loggers": False,
+            "handlers": {
+                # Console JSON output, driven by a QueueListener thread
+                "queue": {"()": _build_queue_handler},
+            },
+            "root": {"level": numeric_level, "handlers": ["queue"]},
+        }
+    )
 
-    # Remove any existing handlers to avoid duplicate logs if this function is called multiple times
-    for handler in root_logger.handlers[:]:
-        root_logger.removeHandler(handler)
+    # Levels only; going through dictConfig's "loggers" section would also strip the
+    # handlers/propagation uvicorn configures on its own loggers.
+    for name, level in _LIBRARY_LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(numeric_level if level is None else level)
 
-    # Console Handler with JSON Formatter
-    console_handler = logging.StreamHandler(sys.stdout)
-    formatter = CustomJsonFormatter(
-        "%(timestamp)s %(level)s %(name)s %(module)s %(funcName)s %(lineno)d %(message)s %(job_id)s"
-    )
-    console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
-
-    # Configure specific loggers if needed (e.g., for libraries)
-    logging.getLogger("uvicorn.access").setLevel(
-        logging.WARNING
-    )  # Quieten access logs unless error
-    logging.getLogger("uvicorn.error").setLevel(numeric_level)
-    logging.getLogger("celery").setLevel(numeric_level)
-    logging.getLogger("sqlalchemy.engine").setLevel(
-        logging.WARNING
-    )  # Set to INFO for query logging
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-    logging.getLogger("chromadb.telemetry.posthog").setLevel(
-        logging.WARNING
-    )  # Silence ChromaDB telemetry logs
+    setup_logging._inited = True
 
     # Test log
     # logging.info("Logging configured with level %s", log_level, extra={"job_id": "system_init"})
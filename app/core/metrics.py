@@ -0,0 +1,45 @@
+# app/core/metrics.py
+# Prometheus metrics recorded by the worker (the API's HTTP metrics come from
+# prometheus_fastapi_instrumentator in app/api/main.py).
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from prometheus_client import Counter, Histogram
+
+NO_CONTEXT_ANSWERS = Counter(
+    "rag_no_context_answers_total",
+    "Jobs completed with the canned NO_CONTEXT_ANSWER because retrieval found no passages.",
+)
+RETRIEVAL_SECONDS = Histogram(
+    "rag_retrieval_seconds",
+    "Time to retrieve passages for a question.",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+GENERATION_SECONDS = Histogram(
+    "rag_generation_seconds",
+    "Time to generate an answer with the LLM.",
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+
+class Timer:
+    __slots__ = ("seconds",)
+
+    def __init__(self):
+        self.seconds: Optional[float] = None  # Set when the timed block exits
+
+
+@contextmanager
+def timed(metric: Histogram) -> Iterator[Timer]:
+    """
+    Times the block with perf_counter and observes the duration on `metric`, also when the
+    block raises. The yielded Timer holds the duration afterwards (e.g. for a log line).
+    """
+    timer = Timer()
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.seconds = time.perf_counter() - start
+        metric.observe(timer.seconds)
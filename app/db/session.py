@@ -1,14 +1,32 @@
 # app/db/session.py
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session as SQLAlchemySession
+from sqlalchemy.orm import scoped_session, sessionmaker, Session as SQLAlchemySession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from app.core.config import settings
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Shared by the sync and async engines
+_engine_kwargs = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    query_cache_size=1200,  # Compiled-statement cache shared by hot queries
+    # orjson for JSON/JSONB columns instead of stdlib json
+    json_serializer=lambda value: orjson.dumps(value).decode(),
+    json_deserializer=orjson.loads,
+)
+
 try:
-    engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+    engine = create_engine(settings.DATABASE_URL, **_engine_kwargs)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    # Thread-local sessions for the Celery worker; tasks call ScopedSession.remove() when
+    # done, which closes the session and returns its connection to the engine pool.
+    ScopedSession = scoped_session(SessionLocal)
     logger.info("Database engine and session created successfully.")
     # You could try a test connection here if needed
     # with engine.connect() as connection:
@@ -18,6 +36,29 @@ except Exception as e:
     # Fallback or raise critical error if DB is essential at startup
     engine = None
     SessionLocal = None
+    ScopedSession = None
+
+
+def _to_async_database_url(database_url: str) -> str:
+    """Rewrites a sync PostgreSQL URL to use the asyncpg driver."""
+    for prefix in ("postgresql+psycopg2://", "postgresql://"):
+        if database_url.startswith(prefix):
+            return "postgresql+asyncpg://" + database_url[len(prefix) :]
+    return database_url
+
+
+# Async engine/session for request handlers running on the event loop (FastAPI).
+# The sync engine above is still used by the Celery worker and table creation.
+try:
+    async_engine = create_async_engine(
+        _to_async_database_url(settings.DATABASE_URL), **_engine_kwargs
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    logger.info("Async database engine and session created successfully.")
+except Exception as e:
+    logger.error(f"Failed to create async database engine or session: {e}", exc_info=True)
+    async_engine = None
+    AsyncSessionLocal = None
 
 
 # Dependency for FastAPI
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import Column, DateTime, func
-import shortuuid
+import secrets
 
 
 class Base(DeclarativeBase):
@@ -28,5 +28,5 @@ class TimestampedModel(Base):
 
 
 def generate_short_uuid():
-    """Generates a short, URL-safe UUID."""
-    return shortuuid.uuid()
+    """Generates a short, URL-safe random ID (128 bits, same entropy as a UUID4)."""
+    return secrets.token_urlsafe(16)
@@ -1,10 +1,10 @@
 # app/models/job.py
 from sqlalchemy import Column, String, Enum as SAEnum, Text, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from app.models.base import (
     TimestampedModel,
     generate_short_uuid,
 )  # Import Base if not using TimestampedModel as direct parent
-from app.db.session import Base  # Use the Base from session.py or base.py
 import enum
 
 
@@ -30,9 +30,12 @@ class Job(TimestampedModel):
     result_text = Column(Text, nullable=True)
 
     # sources can store a list of dictionaries with source_id, chunk_id, relevance_score, url etc.
+    # Stored as JSONB on Postgres (pre-parsed binary, GIN-indexable); plain JSON elsewhere.
+    # Existing databases need:
+    #   ALTER TABLE jobs ALTER COLUMN sources_metadata TYPE jsonb USING sources_metadata::jsonb;
     sources_metadata = Column(
-        JSON, nullable=True
-    )  # Store as JSONB in Postgres for better querying
+        JSON().with_variant(JSONB(), "postgresql"), nullable=True
+    )
 
     # You might want to add more fields, e.g.:
     # error_message = Column(Text, nullable=True)
@@ -0,0 +1,61 @@
+# app/services/answer_stream.py
+# Publishes answer text to Redis pub/sub while it is being generated, so subscribers
+# (e.g. a websocket/SSE gateway) can relay it token by token instead of polling.
+import logging
+from typing import Optional
+
+import orjson
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def answer_stream_channel(job_id: str) -> str:
+    return f"job:{job_id}:stream"
+
+
+class AnswerStreamPublisher:
+    """
+    Per-job publisher. Messages on job:{job_id}:stream are JSON objects:
+    {"delta": "<new text>"} while generating, then {"done": true, "status": "<JobStatus>"}
+    once the result has been written to the database.
+    Publish failures are logged and ignored; streaming is best-effort.
+    """
+
+    def __init__(self, client: redis.Redis, job_id: str):
+        self._client = client
+        self.job_id = job_id
+        self.channel = answer_stream_channel(job_id)
+        self._sent_length = 0  # Characters of the answer already published
+
+    def _publish(self, message: dict):
+        try:
+            self._client.publish(self.channel, orjson.dumps(message))
+        except Exception as e:
+            logger.warning(
+                f"Answer stream publish failed for job {self.job_id}: {e}",
+                extra={"job_id": self.job_id},
+            )
+
+    def on_partial_answer(self, partial_text: str):
+        """on_partial_answer callback: publishes the text added since the last call."""
+        delta = partial_text[self._sent_length :]
+        if delta:
+            self._sent_length = len(partial_text)
+            self._publish({"delta": delta})
+
+    def publish_done(self, status: str):
+        self._publish({"done": True, "status": status})
+
+
+# Global instance (one connection pool per worker process)
+_redis_client_instance: Optional[redis.Redis] = None
+
+
+def get_answer_stream_publisher(job_id: str) -> AnswerStreamPublisher:
+    global _redis_client_instance
+    if _redis_client_instance is None:
+        _redis_client_instance = redis.Redis.from_url(settings.RESPONSE_CACHE_REDIS_URL)
+    return AnswerStreamPublisher(_redis_client_instance, job_id)
@@ -0,0 +1,49 @@
+# app/services/cache_client.py
+import redis.asyncio as aioredis
+from app.core.config import settings
+import logging
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Small async Redis cache for serialized API responses.
+    Cache failures are logged and treated as misses so Redis is never on the critical path.
+    """
+
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        # from_url doesn't connect; connections are opened lazily from the client's pool
+        self._client = aioredis.from_url(redis_url)
+        logger.info("Response cache Redis client initialized.")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self._client.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache GET failed for key '{key}': {e}")
+            return None
+
+    async def set(self, key: str, value: Union[str, bytes], ttl_seconds: int):
+        try:
+            await self._client.setex(key, ttl_seconds, value)
+        except Exception as e:
+            logger.warning(f"Response cache SETEX failed for key '{key}': {e}")
+
+    async def close(self):
+        await self._client.aclose()
+
+
+# Global instance
+_response_cache_instance: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache_instance
+    if _response_cache_instance is None:
+        _response_cache_instance = ResponseCache(
+            redis_url=settings.RESPONSE_CACHE_REDIS_URL
+        )
+    return _response_cache_instance
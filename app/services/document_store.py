@@ -0,0 +1,82 @@
+# app/services/document_store.py
+import hashlib
+import os
+import sqlite3
+import threading
+import logging
+from typing import List, Dict, Any, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+def document_key(doc_id: str) -> int:
+    """
+    Stable integer key for a string document ID, for in-process vector indexes that
+    only accept integer labels. 63 bits, so it is a valid key for both uint64 and
+    int64 label types.
+    """
+    digest = hashlib.blake2b(doc_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") & 0x7FFF_FFFF_FFFF_FFFF
+
+
+class SQLiteDocumentStore:
+    """
+    Sidecar store for chunk text and metadata, keyed by document_key(id). Used next to
+    in-process vector indexes, which only store vectors and integer keys.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared across threads; writes and reads are serialized by _lock.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "key INTEGER PRIMARY KEY, id TEXT NOT NULL, text TEXT, metadata BLOB)"
+            )
+            self._conn.commit()
+        logger.info(f"SQLite document store opened at {path}")
+
+    def add(
+        self, keys: List[int], ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]
+    ):
+        rows = [
+            (key, doc_id, text, orjson.dumps(metadata or {}))
+            for key, doc_id, text, metadata in zip(keys, ids, documents, metadatas)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (key, id, text, metadata) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def get_many(self, keys: List[int]) -> Dict[int, Tuple[str, str, Dict[str, Any]]]:
+        """Returns {key: (id, text, metadata)} for the keys that exist."""
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, id, text, metadata FROM documents WHERE key IN ({placeholders})",
+                list(keys),
+            ).fetchall()
+        return {
+            key: (doc_id, text or "", orjson.loads(metadata) if metadata else {})
+            for key, doc_id, text, metadata in rows
+        }
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
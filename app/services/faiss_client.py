@@ -0,0 +1,182 @@
+# app/services/faiss_client.py
+# In-process FAISS HNSW index built in bulk, for single-node deployments
+# (VECTOR_DB_IMPL=faiss). Requires the optional `faiss-cpu` (or `faiss-gpu`) package.
+import logging
+import os
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import faiss
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+from app.services.document_store import SQLiteDocumentStore, document_key
+from app.services.vector_db_client import _compile_encoder, _embedding_batch_size
+
+logger = logging.getLogger(__name__)
+
+_HNSW_M = 32  # Graph neighbours per node
+_HNSW_EF_CONSTRUCTION = 80
+_HNSW_EF_SEARCH = 64
+
+
+class FaissVectorDBClient:
+    """
+    Same interface as VectorDBClient, backed by a FAISS HNSW index searched in-process
+    plus a SQLite sidecar for chunk text and metadata.
+
+    Built for bulk loads: add_documents only buffers the vectors (the text and metadata
+    go to SQLite right away) and flush() inserts everything buffered with a single
+    index.add call, which builds the graph in C++ across all cores, then writes the
+    index file. Vectors become searchable after flush(); workers see them after a restart.
+    HNSW can't remove vectors, so re-ingesting an existing ID updates its text and
+    metadata but keeps its first vector. Vectors are L2-normalized and compared by
+    inner product, so scores are cosine similarities like the Chroma client's.
+    """
+
+    def __init__(self, index_path: str, store_path: str, embedding_model_name: str):
+        self.index_path = index_path
+        self.embedding_model_name = embedding_model_name
+        self.collection_name = os.path.basename(index_path)  # For log messages
+        self._index = None
+        self._store = None
+        self._encoder = None
+        self._device = "cpu"
+        self._keys = set()  # Keys in the index or buffered for it
+        self._pending_keys: List[np.ndarray] = []
+        self._pending_vectors: List[np.ndarray] = []
+        self._write_lock = threading.Lock()  # Serializes add/flush; search is lock-free
+
+        try:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            self._device = device
+            self._encoder = SentenceTransformer(self.embedding_model_name, device=device)
+            if device == "cuda":
+                self._encoder.half()  # FP16 inference on GPU (tensor cores)
+            _compile_encoder(self._encoder)
+            ndim = self._encoder.get_sentence_embedding_dimension()
+
+            if os.path.exists(self.index_path):
+                self._index = faiss.downcast_index(faiss.read_index(self.index_path))
+                self._keys = set(faiss.vector_to_array(self._index.id_map).tolist())
+            else:
+                hnsw = faiss.IndexHNSWFlat(ndim, _HNSW_M, faiss.METRIC_INNER_PRODUCT)
+                hnsw.hnsw.efConstruction = _HNSW_EF_CONSTRUCTION
+                self._index = faiss.IndexIDMap2(hnsw)  # 63-bit document keys as labels
+            faiss.downcast_index(self._index.index).hnsw.efSearch = _HNSW_EF_SEARCH
+            self._store = SQLiteDocumentStore(store_path)
+            logger.info(
+                f"FAISS index at {self.index_path} ready with {self._index.ntotal} vectors (ndim={ndim})."
+            )
+        except Exception as e:
+            logger.error(f"Failed to initialize FaissVectorDBClient: {e}", exc_info=True)
+            self._index = None
+            self._store = None
+
+    def is_healthy(self) -> bool:
+        return self._index is not None and self._store is not None
+
+    def embed_documents(self, documents: List[str]) -> np.ndarray:
+        """Embeds documents as add_documents would (callers may pass the result back to it)."""
+        with torch.inference_mode():  # No autograd bookkeeping during the forward passes
+            return self._encoder.encode(
+                documents,
+                batch_size=_embedding_batch_size(self._device),
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+
+    def embed_query(self, query_text: str) -> np.ndarray:
+        """Embeds a query (callers may cache it and pass it to query_documents)."""
+        return self.embed_documents([query_text])[0]
+
+    def add_documents(
+        self,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        embeddings: Optional[np.ndarray] = None,
+    ):
+        if not self.is_healthy():
+            logger.error("FAISS index is not initialized. Cannot add documents.")
+            raise ConnectionError("FAISS index not initialized.")
+        try:
+            if embeddings is None:
+                embeddings = self.embed_documents(documents)
+            keys = np.fromiter((document_key(i) for i in ids), dtype=np.int64, count=len(ids))
+            with self._write_lock:
+                self._store.add(keys.tolist(), ids, documents, metadatas)
+                new = np.fromiter(
+                    (k not in self._keys for k in keys.tolist()), dtype=bool, count=len(keys)
+                )
+                if new.any():
+                    self._keys.update(keys[new].tolist())
+                    self._pending_keys.append(keys[new])
+                    self._pending_vectors.append(np.asarray(embeddings, dtype=np.float32)[new])
+            logger.info(
+                f"Buffered {len(documents)} documents for FAISS index '{self.collection_name}'."
+            )
+        except Exception as e:
+            logger.error(f"Error adding documents to FAISS: {e}", exc_info=True)
+            raise
+
+    def flush(self):
+        """Adds all buffered vectors in one call and writes the index to disk."""
+        if not self.is_healthy():
+            return
+        with self._write_lock:
+            if self._pending_keys:
+                keys = np.concatenate(self._pending_keys)
+                vectors = np.ascontiguousarray(np.concatenate(self._pending_vectors))
+                self._pending_keys, self._pending_vectors = [], []
+                self._index.add_with_ids(vectors, keys)
+                logger.info(f"Added {len(keys)} vectors to FAISS index '{self.collection_name}'.")
+            directory = os.path.dirname(self.index_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            faiss.write_index(self._index, self.index_path)
+        logger.info(f"FAISS index saved to {self.index_path}.")
+
+    def query_documents(
+        self, query_text: str, top_k: int = 5, query_embedding=None
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        if not self.is_healthy():
+            logger.error("FAISS index is not initialized. Cannot query documents.")
+            raise ConnectionError("FAISS index not initialized.")
+        try:
+            if query_embedding is None:
+                query_embedding = self.embed_query(query_text)
+            query = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+            similarities, labels = self._index.search(query, top_k)
+            # -1 labels pad the result when the index holds fewer than top_k vectors
+            hits = [(int(k), float(s)) for k, s in zip(labels[0], similarities[0]) if k != -1]
+            rows = self._store.get_many([key for key, _ in hits])
+
+            processed_results = []
+            for key, score in hits:  # Inner product of unit vectors is the cosine similarity
+                row = rows.get(key)
+                if row is None:  # Vector without a stored document
+                    continue
+                doc_id, document_text, metadata = row
+                if "text" not in metadata and document_text:
+                    metadata["text"] = document_text
+                processed_results.append((doc_id, score, metadata))
+
+            logger.info(
+                "Query '%.30s...' returned %d results from '%s'.",
+                query_text,
+                len(processed_results),
+                self.collection_name,
+            )
+            return processed_results
+        except Exception as e:
+            logger.error(f"Error querying documents from FAISS: {e}", exc_info=True)
+            raise
+
+    def get_collection_count(self) -> Optional[int]:
+        if not self.is_healthy():
+            logger.warning("FAISS index is not initialized. Cannot get count.")
+            return None
+        return self._index.ntotal
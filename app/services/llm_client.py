@@ -1,19 +1,57 @@
 # app/services/llm_client.py
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    DynamicCache,
+    TextIteratorStreamer,
+)
+from jinja2.exceptions import TemplateError  # Raised by chat templates
 import torch
 from app.core.config import settings
+import copy
 import logging
-from typing import Optional, List, Dict, Any
+import threading
+from typing import Optional, List, Dict, Any, Callable
 
 logger = logging.getLogger(__name__)
 
+# Generation stops at any of these token strings (besides EOS) when the tokenizer has them
+# as single tokens, and at any of these text sequences (the model starting a new Q&A turn).
+_STOP_TOKENS = ("[/INST]",)
+_STOP_STRINGS = ("\n\nQUESTION:",)
+
+# Shape buckets used with the static KV cache: prompts are left-padded to a multiple of
+# _PROMPT_BUCKET tokens and max_new_tokens is rounded up to one of _MAX_NEW_TOKENS_BUCKETS,
+# so repeated requests reuse the same cache allocation (and, when the model is compiled,
+# the same captured CUDA graphs) instead of re-allocating/recapturing per prompt length.
+_PROMPT_BUCKET = 128
+_MAX_NEW_TOKENS_BUCKETS = (128, 256, 512)
+
+
+def _bucket_max_new_tokens(max_new_tokens: int) -> int:
+    for bucket in _MAX_NEW_TOKENS_BUCKETS:
+        if max_new_tokens <= bucket:
+            return bucket
+    return max_new_tokens
+
 
 class LLMClient:
-    def __init__(self, model_name_or_path: str, hf_token: Optional[str] = None):
+    def __init__(
+        self,
+        model_name_or_path: str,
+        hf_token: Optional[str] = None,
+        quantization: Optional[str] = None,
+        static_kv_cache: bool = False,
+        torch_compile: bool = False,
+    ):
         self.model_name_or_path = model_name_or_path
+        self.use_static_cache = False
+        # Shared prompt-prefix KV cache (see cache_prompt_prefix)
+        self._prefix_key: Optional[str] = None
+        self._prefix_ids = None
+        self._prefix_kv = None
         self.tokenizer = None
         self.model = None
-        self.pipeline = None  # Using pipeline for easier generation
 
         # Determine device
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -25,35 +63,75 @@ class LLMClient:
                 self.model_name_or_path, token=hf_token
             )
             logger.info("Tokenizer loaded successfully.")
+            self._stop_token_ids = self._resolve_stop_token_ids()
 
             logger.info(f"Loading model {self.model_name_or_path}...")
-            # For Mistral or similar models, you might need to specify torch_dtype for memory optimization
-            # e.g., torch_dtype=torch.bfloat16 if using Ampere+ GPUs
+            # bfloat16 on Ampere+ GPUs (compute capability >= 8.0): the dtype Mistral was trained in,
+            # with float32's exponent range (no fp16 overflow in softmax/logits).
+            # float16 on older GPUs, float32 on CPU.
             # For GGUF/GPTQ, loading is different (e.g. via llama-cpp-python, auto-gptq)
-            # This basic loader is for full precision models from HF Hub.
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_name_or_path,
+            # This basic loader is for full precision models from HF Hub, optionally
+            # quantized on load with bitsandbytes (see settings.LLM_QUANTIZATION).
+            if self.device == "cuda":
+                self.dtype = (
+                    torch.bfloat16
+                    if torch.cuda.get_device_capability(0)[0] >= 8
+                    else torch.float16
+                )
+            else:
+                self.dtype = torch.float32
+            model_kwargs = dict(
                 token=hf_token,
-                torch_dtype=(
-                    torch.float16 if self.device == "cuda" else torch.float32
-                ),  # Use float16 on GPU if supported
+                torch_dtype=self.dtype,
                 device_map="auto",  # Automatically distribute model across GPUs if available, or load to self.device
             )
-            logger.info(
-                f"Model {self.model_name_or_path} loaded successfully to device_map='auto'."
+            quantization_config = self._build_quantization_config(quantization)
+            if quantization_config is not None:
+                model_kwargs["quantization_config"] = quantization_config
+            self.attn_implementation = "sdpa"  # PyTorch scaled_dot_product_attention (fused kernels)
+            if self.device == "cuda":
+                # FlashAttention-2 tiles QK^T/softmax/V on-chip; needs the flash-attn package
+                # and an Ampere+ GPU, so fall back to SDPA when it can't be used.
+                try:
+                    self.model = AutoModelForCausalLM.from_pretrained(
+                        self.model_name_or_path,
+                        attn_implementation="flash_attention_2",
+                        **model_kwargs,
+                    )
+                    self.attn_implementation = "flash_attention_2"
+                except (ImportError, ValueError) as e:
+                    logger.warning(
+                        f"FlashAttention-2 unavailable ({e}); falling back to SDPA attention."
+                    )
+            if self.model is None:
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    self.model_name_or_path,
+                    attn_implementation=self.attn_implementation,
+                    **model_kwargs,
+                )
+            self.model.eval()  # Inference only: disables dropout
+            # Static (preallocated) KV cache for fixed-shape decoding on CUDA; opt-in and
+            # only for architectures transformers supports it for.
+            self.use_static_cache = (
+                static_kv_cache
+                and self.device == "cuda"
+                and getattr(self.model, "_supports_static_cache", False)
             )
-
-            # Using Hugging Face pipeline for text generation
-            self.pipeline = pipeline(
-                "text-generation",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                device=(
-                    0 if self.device == "cuda" else -1
-                ),  # device=0 for first GPU, -1 for CPU
-                # torch_dtype=torch.bfloat16 # if model loaded with bfloat16
+            if static_kv_cache and not self.use_static_cache:
+                logger.warning(
+                    "LLM_STATIC_KV_CACHE is set but not supported for this model/device; using the dynamic KV cache."
+                )
+            if torch_compile:
+                self._compile_forward(quantized=quantization_config is not None)
+            if self.device == "cuda":
+                # Return blocks cached by the allocator during loading (state-dict/conversion
+                # temporaries) so the init peak isn't held for the life of the worker.
+                torch.cuda.empty_cache()
+            logger.info(
+                f"Model {self.model_name_or_path} loaded successfully to device_map='auto' "
+                f"with dtype {self.dtype}, quantization '{quantization if quantization_config else 'none'}' "
+                f"and attention implementation '{self.attn_implementation}'."
             )
-            logger.info("Text generation pipeline initialized successfully.")
 
         except Exception as e:
             logger.error(
@@ -63,9 +141,82 @@ class LLMClient:
             # Fallback or re-raise. For now, attributes will remain None.
             self.tokenizer = None
             self.model = None
-            self.pipeline = None
             raise ConnectionError(f"Could not initialize LLM: {e}")
 
+    def _compile_forward(self, quantized: bool):
+        """
+        Compiles the model's forward with torch.compile(mode="reduce-overhead"): pointwise ops
+        (norms, rotary, residuals) are fused and decode steps replay as CUDA graphs, cutting
+        per-token kernel-launch overhead. generate() calls self.forward, so the forward is
+        compiled in place rather than wrapping the module.
+
+        Only done with the static KV cache: CUDA graphs need fixed shapes (a growing
+        DynamicCache changes shape every step, so graphs would be re-recorded rather than
+        replayed), and the outputs of a replayed graph live in graph-owned buffers that the
+        next replay overwrites, which would corrupt the shared prompt-prefix KV cache.
+        The static cache disables that prefix cache (see cache_prompt_prefix).
+        """
+        if self.device != "cuda":
+            logger.warning("LLM_TORCH_COMPILE requires a CUDA GPU; running the model eagerly.")
+            return
+        if not self.use_static_cache:
+            logger.warning(
+                "LLM_TORCH_COMPILE requires the static KV cache (LLM_STATIC_KV_CACHE); running the model eagerly."
+            )
+            return
+        if quantized:
+            # bitsandbytes kernels don't trace well under torch.compile
+            logger.warning("LLM_TORCH_COMPILE is disabled for quantized models; running the model eagerly.")
+            return
+        self.model.forward = torch.compile(
+            self.model.forward, mode="reduce-overhead", fullgraph=False, dynamic=True
+        )
+        # Trigger compilation now rather than on the first request.
+        logger.info("Compiling the LLM forward pass (torch.compile)...")
+        warmup_ids = self.tokenizer("warmup", return_tensors="pt")["input_ids"]
+        # Same bucketed shapes and cache as _generate, so the captured graphs get reused
+        warmup_ids, warmup_mask = self._left_pad_to_bucket(warmup_ids, torch.ones_like(warmup_ids))
+        with torch.inference_mode():
+            self.model.generate(
+                input_ids=warmup_ids.to(self.model.device),
+                attention_mask=warmup_mask.to(self.model.device),
+                max_new_tokens=_bucket_max_new_tokens(4),
+                do_sample=False,
+                pad_token_id=self._pad_token_id(),
+                cache_implementation="static",
+            )
+        logger.info("LLM forward pass compiled.")
+
+    def _build_quantization_config(self, quantization: Optional[str]):
+        """
+        Returns a BitsAndBytesConfig for "4bit" (NF4) or "8bit" weights, or None for full precision.
+        Decode is bound by streaming the weights, so 8-bit/4-bit weights cut per-token time
+        roughly in proportion to the bytes saved (less the dequantization overhead).
+        """
+        if not quantization or quantization.lower() == "none":
+            return None
+        if self.device != "cuda":
+            logger.warning(
+                f"LLM_QUANTIZATION='{quantization}' requires a CUDA GPU; loading full-precision weights."
+            )
+            return None
+
+        from transformers import BitsAndBytesConfig  # Needs the optional bitsandbytes package
+
+        quantization = quantization.lower()
+        if quantization == "4bit":
+            return BitsAndBytesConfig(
+                load_in_4bit=True,
+                bnb_4bit_quant_type="nf4",
+                bnb_4bit_compute_dtype=self.dtype,
+                bnb_4bit_use_double_quant=True,
+            )
+        if quantization == "8bit":
+            return BitsAndBytesConfig(load_in_8bit=True)
+        raise ValueError(
+            f"Unsupported LLM_QUANTIZATION '{quantization}' (expected 'none', '8bit' or '4bit')."
+        )
+
     def generate_text(
         self,
         prompt: str,
@@ -74,96 +225,324 @@ class LLMClient:
         top_p: float = 0.9,
         do_sample: bool = True,  # Must be true if temperature or top_p are set for sampling
     ) -> Optional[str]:
-        if not self.pipeline:
-            logger.error("LLM pipeline is not initialized. Cannot generate text.")
+        """Generates a completion for a raw prompt string (the caller handles any instruction format)."""
+        if not self.model or not self.tokenizer:
+            logger.error("LLM model is not initialized. Cannot generate text.")
+            return None
+
+        logger.info(f"Generating text for prompt (first 100 chars): '{prompt[:100]}...'")
+        try:
+            inputs = self.tokenizer(prompt, return_tensors="pt")
+        except Exception as e:
+            logger.error(f"Error tokenizing LLM prompt: {e}", exc_info=True)
+            return None
+        return self._generate(
+            inputs["input_ids"],
+            inputs["attention_mask"],
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            do_sample=do_sample,
+        )
+
+    def generate_chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_new_tokens: int = 250,
+        temperature: float = 0.1,  # Low temperature for factual answers
+        top_p: float = 0.9,
+        do_sample: bool = True,  # Must be true if temperature or top_p are set for sampling
+        on_partial_text: Optional[Callable[[str], None]] = None,
+        prefix_kv=None,
+    ) -> Optional[str]:
+        """
+        Generates the assistant reply to a list of chat messages ({"role", "content"}).
+        The tokenizer's chat template produces the model-specific instruction format
+        ([INST] ... [/INST] for Mistral) directly as token IDs.
+        If on_partial_text is given, tokens are streamed and it is called with the text
+        generated so far as it grows; the full answer is still returned at the end.
+        prefix_kv is an optional cache copy from copy_prefix_cache().
+        """
+        if not self.model or not self.tokenizer:
+            logger.error("LLM model is not initialized. Cannot generate text.")
+            return None
+
+        logger.info(
+            f"Generating chat reply for {len(messages)} messages "
+            f"(last message, first 100 chars): '{messages[-1]['content'][:100]}...'"
+        )
+        try:
+            input_ids = self._apply_chat_template(messages)
+        except Exception as e:
+            logger.error(f"Error applying the chat template: {e}", exc_info=True)
             return None
+        return self._generate(
+            input_ids,
+            torch.ones_like(input_ids),  # Single unpadded sequence
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            do_sample=do_sample,
+            on_partial_text=on_partial_text,
+            prefix_kv=prefix_kv,
+        )
+
+    def _apply_chat_template(self, messages: List[Dict[str, str]]):
+        try:
+            return self.tokenizer.apply_chat_template(
+                messages, add_generation_prompt=True, return_tensors="pt"
+            )
+        except TemplateError:
+            # Some templates (e.g. Mistral-7B-Instruct-v0.1) reject a "system" role;
+            # fold the system text into the first user message instead.
+            if not messages or messages[0]["role"] != "system" or len(messages) < 2:
+                raise
+            system, first, rest = messages[0], messages[1], messages[2:]
+            merged = {
+                "role": first["role"],
+                "content": f"{system['content']}\n\n{first['content']}",
+            }
+            return self.tokenizer.apply_chat_template(
+                [merged, *rest], add_generation_prompt=True, return_tensors="pt"
+            )
+
+    def cache_prompt_prefix(self, key: str, message_variants: List[List[Dict[str, str]]]):
+        """
+        Precomputes the KV cache for the token prefix shared by every prompt (the
+        instructions at the start of the system message), so that part isn't prefilled
+        again on each request.
+
+        message_variants are two or more chat prompts that differ right after the shared
+        part; the prefix is their longest common run of token IDs (rendered through the
+        chat template), minus the last token, whose merge can depend on what follows.
+        `key` identifies the prefix; calling again with the same key is a no-op.
+        """
+        if key == self._prefix_key or not self.model or not self.tokenizer:
+            return
+        if self.use_static_cache:  # Static caches are preallocated per request shape
+            return
+        try:
+            variant_ids = [self._apply_chat_template(m)[0].tolist() for m in message_variants]
+            prefix_length = 0
+            for token_ids in zip(*variant_ids):
+                if any(t != token_ids[0] for t in token_ids):
+                    break
+                prefix_length += 1
+            prefix_length -= 1
+            if prefix_length <= 0:
+                logger.warning("Prompt variants share no token prefix; prefix KV cache disabled.")
+                return
+
+            prefix_ids = torch.tensor(
+                [variant_ids[0][:prefix_length]], device=self.model.device
+            )
+            with torch.inference_mode():
+                outputs = self.model(
+                    input_ids=prefix_ids, past_key_values=DynamicCache(), use_cache=True
+                )
+            self._prefix_ids = prefix_ids
+            self._prefix_kv = outputs.past_key_values
+            self._prefix_key = key
+            logger.info(f"Cached KV for a {prefix_length}-token shared prompt prefix.")
+        except Exception as e:
+            logger.warning(f"Could not build the prompt-prefix KV cache: {e}", exc_info=True)
+
+    def copy_prefix_cache(self):
+        """
+        Returns a private copy of the prefix KV cache (None if there is none), to pass as
+        generate_chat(prefix_kv=...). The copy doesn't depend on the prompt, so callers can
+        make it while they are still assembling the prompt (e.g. during retrieval).
+        """
+        if self._prefix_kv is None:
+            return None
+        # generate() appends to the cache in place; the shared copy must stay untouched.
+        return copy.deepcopy(self._prefix_kv)
+
+    def _prefix_cache_for(self, input_ids, prefix_kv=None):
+        """
+        Returns a private prefix KV cache if input_ids start with the cached prefix: the
+        given copy from copy_prefix_cache(), or a new copy.
+        """
+        if self._prefix_kv is None:
+            return None
+        prefix_length = self._prefix_ids.shape[1]
+        if input_ids.shape[1] <= prefix_length or not torch.equal(
+            input_ids[:, :prefix_length], self._prefix_ids
+        ):
+            return None
+        return prefix_kv if prefix_kv is not None else self.copy_prefix_cache()
+
+    def _resolve_stop_token_ids(self) -> List[int]:
+        """EOS plus any _STOP_TOKENS that exist as single tokens in this vocabulary."""
+        stop_ids = [self.tokenizer.eos_token_id]
+        for token in _STOP_TOKENS:
+            token_id = self.tokenizer.convert_tokens_to_ids(token)
+            # Unknown tokens map to unk_token_id (or None); those would stop on any unknown piece
+            if token_id is not None and token_id != self.tokenizer.unk_token_id:
+                stop_ids.append(token_id)
+        return [token_id for token_id in stop_ids if token_id is not None]
+
+    def _pad_token_id(self) -> int:
+        if self.tokenizer.pad_token_id is None:
+            return self.tokenizer.eos_token_id
+        return self.tokenizer.pad_token_id
 
+    def _left_pad_to_bucket(self, input_ids, attention_mask):
+        """Left-pads a single prompt to the next multiple of _PROMPT_BUCKET tokens (masked out)."""
+        pad_length = -input_ids.shape[1] % _PROMPT_BUCKET
+        if pad_length == 0:
+            return input_ids, attention_mask
+        pad_ids = input_ids.new_full((input_ids.shape[0], pad_length), self._pad_token_id())
+        pad_mask = attention_mask.new_zeros((attention_mask.shape[0], pad_length))
+        return (
+            torch.cat([pad_ids, input_ids], dim=1),
+            torch.cat([pad_mask, attention_mask], dim=1),
+        )
+
+    def _generate(
+        self,
+        input_ids,
+        attention_mask,
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float,
+        do_sample: bool,
+        on_partial_text: Optional[Callable[[str], None]] = None,
+        prefix_kv=None,
+    ) -> Optional[str]:
         if temperature <= 0:  # Some models expect temp > 0 for sampling
             do_sample = False
             temperature = 0.1  # Set a default if disabling sampling due to temp
 
         try:
-            logger.info(
-                f"Generating text for prompt (first 100 chars): '{prompt[:100]}...'"
-            )
-            # Mistral instruct models expect a specific format, often with [INST] and [/INST]
-            # This should be handled by the prompt construction logic before calling this client.
+            generate_kwargs = {}
+            if self.use_static_cache:
+                input_ids, attention_mask = self._left_pad_to_bucket(
+                    input_ids, attention_mask
+                )
+                max_new_tokens = _bucket_max_new_tokens(max_new_tokens)
+                generate_kwargs["cache_implementation"] = "static"
+
+            # Call generate() directly on the token IDs (no pipeline pre/post-processing).
+            input_ids = input_ids.to(self.model.device)
+            attention_mask = attention_mask.to(self.model.device)
+            if not self.use_static_cache:
+                prefix_kv = self._prefix_cache_for(input_ids, prefix_kv)
+                if prefix_kv is not None:
+                    # generate() only prefills the tokens after the cached prefix
+                    generate_kwargs["past_key_values"] = prefix_kv
 
-            # pipeline output is a list of dictionaries
-            outputs = self.pipeline(
-                prompt,
+            generate_kwargs.update(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
                 max_new_tokens=max_new_tokens,
                 do_sample=do_sample,
                 temperature=(
                     temperature if do_sample else None
                 ),  # only pass temp if sampling
                 top_p=top_p if do_sample else None,  # only pass top_p if sampling
-                # num_return_sequences=1, # Default is 1
-                eos_token_id=self.tokenizer.eos_token_id,
-                pad_token_id=(
-                    self.tokenizer.eos_token_id
-                    if self.tokenizer.pad_token_id is None
-                    else self.tokenizer.pad_token_id
-                ),
+                use_cache=True,  # Reuse the KV cache across decoding steps
+                eos_token_id=self._stop_token_ids,
+                stop_strings=list(_STOP_STRINGS),
+                tokenizer=self.tokenizer,  # Needed by generate() to match stop_strings
+                pad_token_id=self._pad_token_id(),
             )
 
-            if (
-                outputs
-                and isinstance(outputs, list)
-                and outputs[0].get("generated_text")
-            ):
-                generated_text_full = outputs[0]["generated_text"]
-                # The pipeline often returns the prompt + generated text. We need to extract only the new part.
-                # A common way is to check if the generated_text_full starts with the prompt.
-                if generated_text_full.startswith(prompt):
-                    generated_text_answer = generated_text_full[len(prompt) :].strip()
-                else:
-                    # This case might happen if the model or pipeline settings behave differently.
-                    # Or if the prompt itself was part of a chat template applied by the pipeline.
-                    # For now, we'll assume it's the full output and needs stripping.
-                    # A more robust solution might involve looking for specific instruction tokens.
-                    generated_text_answer = (
-                        generated_text_full.strip()
-                    )  # Fallback, might include prompt
-
-                logger.info(
-                    f"LLM generated text (first 100 chars of answer): '{generated_text_answer[:100]}...'"
+            if on_partial_text is None:
+                with torch.inference_mode():
+                    output_ids = self.model.generate(**generate_kwargs)
+                # generate() returns prompt + completion; keep only the newly generated tokens.
+                prompt_length = input_ids.shape[1]
+                generated_text_answer = self.tokenizer.decode(
+                    output_ids[0, prompt_length:], skip_special_tokens=True
                 )
-                return generated_text_answer
             else:
-                logger.warning(
-                    f"LLM generation returned an unexpected output format: {outputs}"
+                generated_text_answer = self._generate_streaming(
+                    generate_kwargs, on_partial_text
                 )
-                return None
+
+            for stop_string in _STOP_STRINGS:  # The matched stop string is part of the output
+                if generated_text_answer.endswith(stop_string):
+                    generated_text_answer = generated_text_answer[: -len(stop_string)]
+                    break
+            generated_text_answer = generated_text_answer.strip()
+
+            logger.info(
+                f"LLM generated text (first 100 chars of answer): '{generated_text_answer[:100]}...'"
+            )
+            return generated_text_answer
         except Exception as e:
             logger.error(f"Error during LLM text generation: {e}", exc_info=True)
             return None
 
+    def _generate_streaming(
+        self, generate_kwargs: Dict[str, Any], on_partial_text: Callable[[str], None]
+    ) -> str:
+        """
+        Runs generate() on a background thread with a TextIteratorStreamer and reports the
+        growing text from this thread. Returns the full generated text (prompt excluded).
+        """
+        streamer = TextIteratorStreamer(
+            self.tokenizer, skip_prompt=True, skip_special_tokens=True
+        )
+        generation_error: List[BaseException] = []
+
+        def _run_generate():
+            try:
+                with torch.inference_mode():  # Thread-local, so entered on the generating thread
+                    self.model.generate(streamer=streamer, **generate_kwargs)
+            except BaseException as e:
+                generation_error.append(e)
+                streamer.end()  # Unblock the consumer loop below
+
+        thread = threading.Thread(target=_run_generate, daemon=True)
+        thread.start()
+        generated_text = ""
+        for text_chunk in streamer:
+            if text_chunk:
+                generated_text += text_chunk
+                try:
+                    on_partial_text(generated_text)
+                except Exception as e:  # A failing consumer must not abort generation
+                    logger.warning(f"Partial-text callback failed: {e}")
+        thread.join()
+        if generation_error:
+            raise generation_error[0]
+        return generated_text
+
 
 # Global instance
 _llm_client_instance: Optional[LLMClient] = None
+_llm_lock = threading.Lock()
 
 
 def get_llm_client() -> LLMClient:
     global _llm_client_instance
     if _llm_client_instance is None:
-        logger.info("Initializing global LLMClient instance.")
-        model_to_load = (
-            settings.LLM_MODEL_PATH
-            if settings.LLM_MODEL_PATH
-            else settings.LLM_MODEL_NAME
-        )
-        try:
-            _llm_client_instance = LLMClient(
-                model_name_or_path=model_to_load,
-                hf_token=settings.HUGGING_FACE_HUB_TOKEN,
-            )
-        except (
-            ConnectionError
-        ) as e:  # Catch the specific error raised by LLMClient constructor
-            logger.error(f"Fatal error: LLMClient could not be initialized: {e}")
-            _llm_client_instance = None  # Ensure it's None if init failed
-            raise  # Re-raise to signal critical failure
+        # Double-checked locking: concurrent first calls (threaded/gevent pools) must not
+        # load the model twice; once initialized, no lock is taken.
+        with _llm_lock:
+            if _llm_client_instance is None:
+                logger.info("Initializing global LLMClient instance.")
+                model_to_load = (
+                    settings.LLM_MODEL_PATH
+                    if settings.LLM_MODEL_PATH
+                    else settings.LLM_MODEL_NAME
+                )
+                try:
+                    _llm_client_instance = LLMClient(
+                        model_name_or_path=model_to_load,
+                        hf_token=settings.HUGGING_FACE_HUB_TOKEN,
+                        quantization=settings.LLM_QUANTIZATION,
+                        static_kv_cache=settings.LLM_STATIC_KV_CACHE,
+                        torch_compile=settings.LLM_TORCH_COMPILE,
+                    )
+                except (
+                    ConnectionError
+                ) as e:  # Catch the specific error raised by LLMClient constructor
+                    logger.error(f"Fatal error: LLMClient could not be initialized: {e}")
+                    _llm_client_instance = None  # Ensure it's None if init failed
+                    raise  # Re-raise to signal critical failure
 
     if (
         _llm_client_instance is None
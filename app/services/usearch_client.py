@@ -0,0 +1,158 @@
+# app/services/usearch_client.py
+# In-process vector search for single-node deployments (VECTOR_DB_IMPL=usearch).
+# Requires the optional `usearch` package.
+import logging
+import os
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+from usearch.index import Index
+
+from app.services.document_store import SQLiteDocumentStore, document_key
+from app.services.vector_db_client import _compile_encoder, _embedding_batch_size
+
+logger = logging.getLogger(__name__)
+
+
+class USearchVectorDBClient:
+    """
+    Same interface as VectorDBClient, backed by a USearch HNSW index searched in-process
+    (no HTTP round-trip per query) plus a SQLite sidecar for chunk text and metadata.
+
+    Vectors are L2-normalized and stored as f16 with the inner-product metric, so
+    1 - distance is the cosine similarity, matching the Chroma client's scores.
+    The index file is loaded at startup; documents ingested by another process become
+    visible to workers after they restart.
+    """
+
+    def __init__(self, index_path: str, store_path: str, embedding_model_name: str):
+        self.index_path = index_path
+        self.embedding_model_name = embedding_model_name
+        self.collection_name = os.path.basename(index_path)  # For log messages
+        self._index = None
+        self._store = None
+        self._encoder = None
+        self._device = "cpu"
+        self._write_lock = threading.Lock()  # Serializes add/save; search is lock-free
+
+        try:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            self._device = device
+            self._encoder = SentenceTransformer(self.embedding_model_name, device=device)
+            if device == "cuda":
+                self._encoder.half()  # FP16 inference on GPU (tensor cores)
+            _compile_encoder(self._encoder)
+            ndim = self._encoder.get_sentence_embedding_dimension()
+
+            self._index = Index(ndim=ndim, metric="ip", dtype="f16")
+            if os.path.exists(self.index_path):
+                self._index.load(self.index_path)
+            self._store = SQLiteDocumentStore(store_path)
+            logger.info(
+                f"USearch index at {self.index_path} ready with {len(self._index)} vectors (ndim={ndim})."
+            )
+        except Exception as e:
+            logger.error(f"Failed to initialize USearchVectorDBClient: {e}", exc_info=True)
+            self._index = None
+            self._store = None
+
+    def is_healthy(self) -> bool:
+        return self._index is not None and self._store is not None
+
+    def embed_documents(self, documents: List[str]) -> np.ndarray:
+        """Embeds documents as add_documents would (callers may pass the result back to it)."""
+        with torch.inference_mode():  # No autograd bookkeeping during the forward passes
+            return self._encoder.encode(
+                documents,
+                batch_size=_embedding_batch_size(self._device),
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+
+    def embed_query(self, query_text: str) -> np.ndarray:
+        """Embeds a query (callers may cache it and pass it to query_documents)."""
+        return self.embed_documents([query_text])[0]
+
+    def add_documents(
+        self,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        embeddings: Optional[np.ndarray] = None,
+    ):
+        if not self.is_healthy():
+            logger.error("USearch index is not initialized. Cannot add documents.")
+            raise ConnectionError("USearch index not initialized.")
+        try:
+            if embeddings is None:
+                embeddings = self.embed_documents(documents)
+            keys = np.fromiter((document_key(i) for i in ids), dtype=np.uint64, count=len(ids))
+            with self._write_lock:
+                existing = np.asarray(self._index.contains(keys), dtype=bool)
+                if existing.any():  # Re-ingested IDs replace their previous vector
+                    self._index.remove(keys[existing])
+                self._index.add(keys, embeddings.astype(np.float16))
+                self._store.add(keys.tolist(), ids, documents, metadatas)
+            logger.info(
+                f"Added {len(documents)} documents to USearch index '{self.collection_name}'."
+            )
+        except Exception as e:
+            logger.error(f"Error adding documents to USearch: {e}", exc_info=True)
+            raise
+
+    def flush(self):
+        """Writes the index to disk (the SQLite store commits on every add)."""
+        if not self.is_healthy():
+            return
+        with self._write_lock:
+            directory = os.path.dirname(self.index_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._index.save(self.index_path)
+        logger.info(f"USearch index saved to {self.index_path}.")
+
+    def query_documents(
+        self, query_text: str, top_k: int = 5, query_embedding=None
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        if not self.is_healthy():
+            logger.error("USearch index is not initialized. Cannot query documents.")
+            raise ConnectionError("USearch index not initialized.")
+        try:
+            if query_embedding is None:
+                query_embedding = self.embed_query(query_text)
+            matches = self._index.search(query_embedding.astype(np.float16), top_k)
+            keys = [int(k) for k in matches.keys]
+            rows = self._store.get_many(keys)
+
+            processed_results = []
+            for key, distance in zip(keys, matches.distances):
+                row = rows.get(key)
+                if row is None:  # Vector without a stored document (e.g. interrupted ingest)
+                    continue
+                doc_id, document_text, metadata = row
+                # Inner-product distance on unit vectors is 1 - cosine similarity
+                score = 1.0 - float(distance)
+                if "text" not in metadata and document_text:
+                    metadata["text"] = document_text
+                processed_results.append((doc_id, score, metadata))
+
+            logger.info(
+                "Query '%.30s...' returned %d results from '%s'.",
+                query_text,
+                len(processed_results),
+                self.collection_name,
+            )
+            return processed_results
+        except Exception as e:
+            logger.error(f"Error querying documents from USearch: {e}", exc_info=True)
+            raise
+
+    def get_collection_count(self) -> Optional[int]:
+        if not self.is_healthy():
+            logger.warning("USearch index is not initialized. Cannot get count.")
+            return None
+        return len(self._index)
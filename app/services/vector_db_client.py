@@ -1,12 +1,42 @@
 # app/services/vector_db_client.py
 import chromadb
+from chromadb.config import Settings as ChromaSettings
 from chromadb.utils import embedding_functions
 from app.core.config import settings
 import logging
+import threading
+import time
+import torch
 from typing import List, Dict, Any, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+_HEARTBEAT_CACHE_TTL_SECONDS = 5.0
+
+
+def _embedding_batch_size(device: str) -> int:
+    """encode() batch size for documents; FP16 on GPU halves activation memory."""
+    if device == "cuda":
+        return settings.EMBEDDING_BATCH_SIZE_GPU
+    return settings.EMBEDDING_BATCH_SIZE
+
+
+def _compile_encoder(encoder) -> None:
+    """
+    With USE_COMPILED_EMBED, replaces the SentenceTransformer's Hugging Face model with a
+    torch.compile'd version (fused kernels, no per-op Python dispatch). dynamic=True so
+    the varying sequence lengths of padded batches don't each trigger a recompile.
+    Compilation happens lazily on the first encode(); failures keep the eager model.
+    """
+    if not settings.USE_COMPILED_EMBED:
+        return
+    try:
+        transformer = encoder[0]  # sentence_transformers.models.Transformer module
+        transformer.auto_model = torch.compile(transformer.auto_model, dynamic=True)
+        logger.info("Embedding model compiled with torch.compile.")
+    except Exception as e:
+        logger.warning(f"torch.compile of the embedding model failed, using eager mode: {e}")
+
 
 class VectorDBClient:
     def __init__(
@@ -19,10 +49,20 @@ class VectorDBClient:
         self._client = None
         self._collection = None
         self._ef = None  # Embedding function
+        self._encoder = None
+        self._device = "cpu"
+        self._distance_range_checked = False
+        self._last_healthy_at: Optional[float] = None  # monotonic time of last successful heartbeat
 
         try:
-            # Using HttpClient for connecting to a remote ChromaDB server
-            self._client = chromadb.HttpClient(host=self.host, port=self.port)
+            # Using HttpClient for connecting to a remote ChromaDB server. It keeps one
+            # keep-alive httpx session for all requests; telemetry is off so client init
+            # doesn't make an extra outbound call.
+            self._client = chromadb.HttpClient(
+                host=self.host,
+                port=self.port,
+                settings=ChromaSettings(anonymized_telemetry=False),
+            )
             logger.info(f"ChromaDB HTTP client initialized for {self.host}:{self.port}")
 
             # Ping the server to check connectivity
@@ -32,10 +72,18 @@ class VectorDBClient:
             # Initialize the embedding function
             # This will download the model if not already cached by sentence-transformers
             # Ensure the worker has internet access or the model is pre-cached in the Docker image
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            self._device = device
             self._ef = embedding_functions.SentenceTransformerEmbeddingFunction(
                 model_name=self.embedding_model_name,
-                # device="cuda" if torch.cuda.is_available() else "cpu" # Set device if needed
+                device=device,
+                normalize_embeddings=True,  # Unit vectors (queries and documents alike)
             )
+            self._encoder = getattr(self._ef, "_model", None)  # Underlying SentenceTransformer
+            if device == "cuda" and self._encoder is not None:
+                self._encoder.half()  # FP16 inference on GPU (tensor cores)
+            if self._encoder is not None:
+                _compile_encoder(self._encoder)
             logger.info(
                 f"SentenceTransformer embedding function initialized with model: {self.embedding_model_name}"
             )
@@ -45,9 +93,13 @@ class VectorDBClient:
             # if the collection is created with a specific embedding function.
             # If the collection exists, ChromaDB usually expects queries with vectors,
             # or it uses the EF associated with the collection.
+            # Cosine space: scores below are 1 - cosine distance. The space is fixed when the
+            # collection is created; an existing collection keeps its original metric
+            # (default L2) until it is dropped and re-ingested.
             self._collection = self._client.get_or_create_collection(
                 name=self.collection_name,
                 embedding_function=self._ef,  # Pass EF here for consistency
+                metadata={"hnsw:space": "cosine"},
             )
             logger.info(
                 f"ChromaDB collection '{self.collection_name}' retrieved/created successfully."
@@ -65,14 +117,28 @@ class VectorDBClient:
     def is_healthy(self) -> bool:
         if not self._client:
             return False
+        # get_vector_db_client() checks health on every call; reuse a recent successful
+        # heartbeat instead of hitting the server each time. Failures are never cached.
+        now = time.monotonic()
+        if (
+            self._last_healthy_at is not None
+            and now - self._last_healthy_at < _HEARTBEAT_CACHE_TTL_SECONDS
+        ):
+            return True
         try:
             self._client.heartbeat()
+            self._last_healthy_at = now
             return True
         except Exception:
+            self._last_healthy_at = None
             return False
 
     def add_documents(
-        self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str]
+        self,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        embeddings=None,
     ):
         if not self._collection:
             logger.error(
@@ -80,14 +146,14 @@ class VectorDBClient:
             )
             raise ConnectionError("ChromaDB collection not initialized.")
         try:
-            # ChromaDB's add method can take embeddings directly or generate them if an EF is associated
-            # If EF is associated with collection, it might use that.
-            # Or, you can pass embeddings explicitly:
-            # embeddings = self._ef(documents) # Generate embeddings
-            # self._collection.add(embeddings=embeddings, metadatas=metadatas, ids=ids)
-
-            # If EF is associated with the collection at creation, it should handle embedding internally for documents.
-            self._collection.add(documents=documents, metadatas=metadatas, ids=ids)
+            # Embed the whole batch in one encode() call (large batches, on GPU when available)
+            # unless the caller already did, and pass the vectors explicitly, so Chroma
+            # stores them without re-embedding.
+            if embeddings is None:
+                embeddings = self.embed_documents(documents)
+            self._collection.add(
+                embeddings=embeddings, documents=documents, metadatas=metadatas, ids=ids
+            )
             logger.info(
                 f"Added {len(documents)} documents to collection '{self.collection_name}'."
             )
@@ -95,8 +161,37 @@ class VectorDBClient:
             logger.error(f"Error adding documents to ChromaDB: {e}", exc_info=True)
             raise
 
+    def _check_distance_range(self, distances: List[Optional[float]]):
+        """One-time sanity check that the collection really uses cosine distance (range [0, 2])."""
+        self._distance_range_checked = True
+        out_of_range = [d for d in distances if d is not None and not -1e-3 <= d <= 2.0 + 1e-3]
+        if out_of_range:
+            logger.warning(
+                f"Collection '{self.collection_name}' returned distances outside the cosine range "
+                f"[0, 2] (e.g. {out_of_range[0]}); it was probably created with another metric. "
+                f"Relevance scores will be wrong until it is re-created and re-ingested."
+            )
+
+    def embed_documents(self, documents: List[str]):
+        """Embeds documents as add_documents would (callers may pass the result back to it)."""
+        if self._encoder is None:  # Fall back to the embedding function's own batching
+            return self._ef(documents)
+        with torch.inference_mode():  # No autograd bookkeeping during the forward passes
+            embeddings = self._encoder.encode(
+                documents,
+                batch_size=_embedding_batch_size(self._device),
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+        return embeddings.astype("float32", copy=False)  # FP16 model output on GPU
+
+    def embed_query(self, query_text: str):
+        """Embeds a query with the collection's embedding function (callers may cache it)."""
+        return self._ef([query_text])[0]
+
     def query_documents(
-        self, query_text: str, top_k: int = 5
+        self, query_text: str, top_k: int = 5, query_embedding=None
     ) -> List[Tuple[str, float, Dict[str, Any]]]:
         if not self._collection:
             logger.error(
@@ -104,9 +199,12 @@ class VectorDBClient:
             )
             raise ConnectionError("ChromaDB collection not initialized.")
         try:
-            # Querying with text, ChromaDB will use the associated embedding function
+            # Query by vector, embedded with the collection's embedding function (unless the
+            # caller passed a cached embedding), so results match querying by text.
+            if query_embedding is None:
+                query_embedding = self.embed_query(query_text)
             results = self._collection.query(
-                query_texts=[query_text],
+                query_embeddings=[query_embedding],
                 n_results=top_k,
                 include=[
                     "metadatas",
@@ -121,31 +219,23 @@ class VectorDBClient:
 
             processed_results = []
             if results and results["ids"] and results["ids"][0]:
-                for i in range(len(results["ids"][0])):
-                    doc_id = results["ids"][0][i]
-                    distance = (
-                        results["distances"][0][i]
-                        if results["distances"] and results["distances"][0]
-                        else None
-                    )
-                    metadata = (
-                        results["metadatas"][0][i]
-                        if results["metadatas"] and results["metadatas"][0]
-                        else {}
-                    )
-                    document_text = (
-                        results["documents"][0][i]
-                        if results["documents"] and results["documents"][0]
-                        else ""
-                    )
+                ids = results["ids"][0]
+                # Unpack each included field once instead of indexing per element
+                distances = (results["distances"] or [None])[0] or [None] * len(ids)
+                if not self._distance_range_checked:
+                    self._check_distance_range(distances)
+                metadatas = (results["metadatas"] or [None])[0] or [None] * len(ids)
+                documents = (results["documents"] or [None])[0] or [""] * len(ids)
 
-                    # Assuming distance is L2, convert to a pseudo-similarity (higher is better) if needed, or use as is.
-                    # For cosine similarity (if used by EF), distance might already be similarity.
-                    # Here, we'll just use the distance as the score.
-                    score = (
-                        1.0 - distance if distance is not None else 0.0
-                    )  # Example for L2, needs adjustment for cosine
+                for doc_id, distance, metadata, document_text in zip(
+                    ids, distances, metadatas, documents
+                ):
+                    # Cosine distance is 1 - cosine similarity, so this is the similarity
+                    # (higher is better, in [-1, 1]).
+                    score = 1.0 - distance if distance is not None else 0.0
 
+                    if metadata is None:
+                        metadata = {}
                     # Ensure metadata has 'text' if not included in 'documents' from Chroma
                     if "text" not in metadata and document_text:
                         metadata["text"] = document_text
@@ -155,13 +245,19 @@ class VectorDBClient:
                     )
 
             logger.info(
-                f"Query '{query_text[:30]}...' returned {len(processed_results)} results from '{self.collection_name}'."
+                "Query '%.30s...' returned %d results from '%s'.",
+                query_text,
+                len(processed_results),
+                self.collection_name,
             )
             return processed_results
         except Exception as e:
             logger.error(f"Error querying documents from ChromaDB: {e}", exc_info=True)
             raise
 
+    def flush(self):
+        """No-op: the Chroma server persists added documents itself."""
+
     def get_collection_count(self) -> Optional[int]:
         if not self._collection:
             logger.warning("ChromaDB collection is not initialized. Cannot get count.")
@@ -175,28 +271,61 @@ class VectorDBClient:
 
 # Global instance (optional, can be managed by a dependency injection system or context)
 _vector_db_client_instance: Optional[VectorDBClient] = None
+_vector_db_lock = threading.Lock()
+
+
+def create_vector_db_client():
+    """
+    Builds a client for the configured VECTOR_DB_IMPL: "chromadb" (remote Chroma server,
+    default), "usearch" (in-process index, single-node deployments) or "faiss" (in-process
+    index built in one bulk insert when ingestion flushes).
+    """
+    if settings.VECTOR_DB_IMPL == "usearch":
+        # Imported lazily: usearch is an optional dependency
+        from app.services.usearch_client import USearchVectorDBClient
+
+        return USearchVectorDBClient(
+            index_path=settings.USEARCH_INDEX_PATH,
+            store_path=settings.USEARCH_STORE_PATH,
+            embedding_model_name=settings.EMBEDDING_MODEL_NAME,
+        )
+    if settings.VECTOR_DB_IMPL == "faiss":
+        # Imported lazily: faiss is an optional dependency
+        from app.services.faiss_client import FaissVectorDBClient
+
+        return FaissVectorDBClient(
+            index_path=settings.FAISS_INDEX_PATH,
+            store_path=settings.FAISS_METADATA_PATH,
+            embedding_model_name=settings.EMBEDDING_MODEL_NAME,
+        )
+    return VectorDBClient(
+        host=settings.CHROMA_HOST,
+        port=settings.CHROMA_PORT,
+        collection_name=settings.CHROMA_COLLECTION_NAME,
+        embedding_model_name=settings.EMBEDDING_MODEL_NAME,
+    )
 
 
 def get_vector_db_client() -> VectorDBClient:
     global _vector_db_client_instance
     if _vector_db_client_instance is None:
-        logger.info("Initializing global VectorDBClient instance.")
-        _vector_db_client_instance = VectorDBClient(
-            host=settings.CHROMA_HOST,
-            port=settings.CHROMA_PORT,
-            collection_name=settings.CHROMA_COLLECTION_NAME,
-            embedding_model_name=settings.EMBEDDING_MODEL_NAME,
-        )
-        if not _vector_db_client_instance.is_healthy():
-            logger.error(
-                "Failed to initialize a healthy global VectorDBClient instance."
-            )
-            # raise ConnectionError("Failed to connect to VectorDB on initialization")
-            # Or allow it to be None and handle in calling code
-            _vector_db_client_instance = None  # Set back to None if unhealthy
-            raise ConnectionError(
-                "Failed to establish a healthy connection with VectorDB."
-            )
+        # Double-checked locking so concurrent first calls don't load the embedding model twice
+        with _vector_db_lock:
+            if _vector_db_client_instance is None:
+                logger.info("Initializing global VectorDBClient instance.")
+                client = create_vector_db_client()
+                if not client.is_healthy():
+                    logger.error(
+                        "Failed to initialize a healthy global VectorDBClient instance."
+                    )
+                    # raise ConnectionError("Failed to connect to VectorDB on initialization")
+                    # Or allow it to be None and handle in calling code
+                    # (the global stays None if unhealthy)
+                    raise ConnectionError(
+                        "Failed to establish a healthy connection with VectorDB."
+                    )
+                # Publish only a fully initialized, healthy client
+                _vector_db_client_instance = client
 
     if _vector_db_client_instance and not _vector_db_client_instance.is_healthy():
         logger.warning(
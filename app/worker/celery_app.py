@@ -1,5 +1,6 @@
 # app/worker/celery_app.py
 from celery import Celery
+from celery.signals import worker_process_init
 from app.core.config import settings
 from app.core.logging_config import (
     setup_logging,
@@ -23,15 +24,29 @@ celery_app = Celery(
 
 # Optional Celery configuration, see the application user guide.
 celery_app.conf.update(
-    task_serializer="json",  # Default is pickle, json is safer
-    result_serializer="json",
-    accept_content=["json"],  # Specify the content types to accept
+    # msgpack: faster to encode/decode and smaller in Redis than JSON. Task args and
+    # results must be plain types (str/int/float/bool/None/list/dict); convert numpy
+    # arrays and other objects to lists/dicts before passing them to a task.
+    task_serializer="msgpack",
+    result_serializer="msgpack",
+    accept_content=["msgpack", "json"],  # json kept so messages queued before the switch still run
     timezone="UTC",  # It's good practice to use UTC
     enable_utc=True,
-    # task_acks_late=True, # Acknowledge tasks after they complete/fail (requires careful handling of idempotency)
-    # worker_prefetch_multiplier=1, # If tasks are long-running and you want one task per worker process at a time
-    # task_track_started=True, # To get 'STARTED' state for tasks
-    # broker_connection_retry_on_startup=True, # Retry connecting to broker on startup
+    # Connections kept open in the broker pool (shared by the API's publishers)
+    broker_pool_limit=settings.CELERY_BROKER_POOL_LIMIT,
+    # Keep idle pooled connections alive so they aren't silently dropped by NAT/LBs
+    broker_transport_options={"socket_keepalive": True},
+    # Acknowledge tasks after they complete/fail; process_question_task skips jobs that are
+    # already COMPLETED, so a redelivered message doesn't redo the work.
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,  # Requeue (rather than drop) tasks whose worker process died
+    # Tasks are long-running (LLM generation): one in-flight task per worker process, so queued
+    # work isn't held in one process's prefetch buffer while siblings sit idle.
+    worker_prefetch_multiplier=1,
+    # Report 'STARTED' when a worker picks a task up. The API derives the PROCESSING job
+    # status from this, so process_question_task doesn't write PROCESSING to the DB.
+    task_track_started=True,
+    broker_connection_retry_on_startup=True,  # Retry connecting to broker on startup
 )
 
 # Example: Configure a default queue if not specified elsewhere
@@ -47,6 +62,55 @@ celery_app.conf.update(
 # You can also load configuration from a Celery config module if you have one:
 # celery_app.config_from_object('app.worker.celeryconfig') # If you create celeryconfig.py
 
+
+
+@worker_process_init.connect
+def reset_db_pool(**kwargs):
+    """
+    Drops database connections inherited from the parent process (sockets must not be shared
+    across fork) and opens one fresh connection so the first task doesn't pay for the connect.
+    """
+    from app.db.session import engine
+
+    if engine is None:
+        return
+    engine.dispose(close=False)  # Leave the parent's connections to the parent
+    try:
+        with engine.connect():
+            pass
+    except Exception as e:
+        logger.warning(f"Could not pre-open a database connection: {e}")
+
+
+@worker_process_init.connect
+def warm_up_models(**kwargs):
+    """
+    Loads the LLM and embedding model in each worker process before it accepts tasks, and
+    runs one tiny generation/query so CUDA context setup, kernel selection and model
+    downloads don't land on the first user request.
+    """
+    if not settings.WORKER_WARMUP_ENABLED:
+        return
+    # Imported here: the API also imports this module (to send tasks) but never needs the models.
+    from app.services.llm_client import get_llm_client
+    from app.services.vector_db_client import get_vector_db_client
+    from app.worker.logic import _fusion_numba
+    from app.worker.worker_state import init_worker_state
+
+    logger.info("Warming up models for this worker process...")
+    try:
+        llm_client = get_llm_client()
+        llm_client.generate_text("warmup", max_new_tokens=4)
+        init_worker_state()  # Shared retriever + AnswerGenerator (builds the prompt-prefix KV cache)
+        vector_db_client = get_vector_db_client()
+        vector_db_client.query_documents("warmup", top_k=1)
+        _fusion_numba.warm_up()  # JIT-compile the RRF kernel (no-op without numba)
+        logger.info("Worker process warm-up completed.")
+    except Exception as e:
+        # Not fatal: tasks initialize (and retry) the services themselves.
+        logger.warning(f"Worker process warm-up failed: {e}", exc_info=True)
+
+
 logger.info(
     f"Celery app '{celery_app.main}' initialized with broker: {settings.CELERY_BROKER_URL} and backend: {settings.CELERY_RESULT_BACKEND}"
 )
@@ -0,0 +1,124 @@
+# app/worker/logic/_fusion_numba.py
+# Numba-compiled Reciprocal Rank Fusion + top-k selection for HybridRetriever._rrf_fuse.
+# numba is optional: without it _NUMBA_AVAILABLE is False and the retriever keeps its
+# pure-Python dict + heapq path.
+import logging
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numba
+
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    _NUMBA_AVAILABLE = False
+
+
+def _worse(scores, a, b):
+    """True if candidate a ranks below b (lower score; ties go to the first-seen id)."""
+    return scores[a] < scores[b] or (scores[a] == scores[b] and a > b)
+
+
+def _sift_down(heap, size, pos, scores):
+    # Min-heap on "worse": the root is the weakest of the current top-k
+    while True:
+        child = 2 * pos + 1
+        if child >= size:
+            return
+        if child + 1 < size and _worse(scores, heap[child + 1], heap[child]):
+            child += 1
+        if not _worse(scores, heap[child], heap[pos]):
+            return
+        heap[pos], heap[child] = heap[child], heap[pos]
+        pos = child
+
+
+def _rrf_topk(ids, ranks, n_ids, k_const, top_k):
+    """
+    ids/ranks: int32 arrays of (candidate id, 1-based rank) entries over all ranked lists.
+    Returns (top ids, their RRF scores), best first.
+    """
+    scores = np.zeros(n_ids, np.float64)
+    for i in range(ids.shape[0]):
+        scores[ids[i]] += 1.0 / (k_const + ranks[i])
+
+    size = min(top_k, n_ids)
+    heap = np.empty(size, np.int32)
+    for cand in range(n_ids):
+        if cand < size:
+            heap[cand] = cand
+            if cand == size - 1:
+                for pos in range(size // 2 - 1, -1, -1):
+                    _sift_down(heap, size, pos, scores)
+        elif _worse(scores, heap[0], cand):
+            heap[0] = cand
+            _sift_down(heap, size, 0, scores)
+
+    # Heap -> best-first order (size is top_k, so insertion sort is fine)
+    for i in range(1, size):
+        cur = heap[i]
+        j = i - 1
+        while j >= 0 and _worse(scores, heap[j], cur):
+            heap[j + 1] = heap[j]
+            j -= 1
+        heap[j + 1] = cur
+
+    top_scores = np.empty(size, np.float64)
+    for i in range(size):
+        top_scores[i] = scores[heap[i]]
+    return heap, top_scores
+
+
+if _NUMBA_AVAILABLE:
+    _worse = numba.njit(cache=True)(_worse)
+    _sift_down = numba.njit(cache=True)(_sift_down)
+    _rrf_topk = numba.njit(cache=True)(_rrf_topk)
+
+
+def rrf_topk(
+    ranked_lists: List[List[Tuple[str, float, Dict[str, Any]]]], k: int, top_k: int
+) -> List[Tuple[str, float, Dict[str, Any]]]:
+    """
+    Same result as HybridRetriever's pure-Python RRF: the top_k (chunk_id, rrf_score,
+    first-seen metadata) tuples, best first. Chunk IDs are mapped to dense ints per call.
+    """
+    id_of: Dict[str, int] = {}
+    chunk_ids: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    ids: List[int] = []
+    ranks: List[int] = []
+    for ranked in ranked_lists:
+        for rank, (chunk_id, _score, metadata) in enumerate(ranked, start=1):
+            idx = id_of.get(chunk_id)
+            if idx is None:
+                idx = id_of[chunk_id] = len(chunk_ids)
+                chunk_ids.append(chunk_id)
+                metadatas.append(metadata)
+            ids.append(idx)
+            ranks.append(rank)
+    if not chunk_ids or top_k <= 0:
+        return []
+
+    top_ids, top_scores = _rrf_topk(
+        np.asarray(ids, dtype=np.int32),
+        np.asarray(ranks, dtype=np.int32),
+        len(chunk_ids),
+        float(k),
+        top_k,
+    )
+    return [
+        (chunk_ids[idx], float(score), metadatas[idx])
+        for idx, score in zip(top_ids.tolist(), top_scores.tolist())
+    ]
+
+
+def warm_up():
+    """Compiles (or loads from the on-disk cache) the kernel so the first query doesn't pay for it."""
+    if not _NUMBA_AVAILABLE:
+        return
+    rrf_topk([[("a", 0.0, {}), ("b", 0.0, {})], [("b", 0.0, {})]], k=60, top_k=1)
+    logger.info("RRF fusion kernel compiled.")
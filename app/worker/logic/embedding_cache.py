@@ -0,0 +1,59 @@
+# app/worker/logic/embedding_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.config import settings
+
+
+def embedding_key(question: str) -> bytes:
+    """
+    16-byte digest of the question, so cache keys stay small however long the question is.
+    Only surrounding whitespace is normalized: the embedding is computed from the text as
+    given, and embedding models may be case-sensitive.
+    """
+    return hashlib.blake2b(question.strip().encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU of question -> query embedding, shared by every retriever in the worker
+    process. Sits below QueryCache: when the result cache misses (or has expired) but the
+    question was seen before, only the ANN search runs, not the encoder.
+    """
+
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[Any]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)  # Most recently used
+            return embedding
+
+    def put(self, key: bytes, embedding: Any):
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Global instance (one per worker process)
+_embedding_cache_instance: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _embedding_cache_instance
+    if _embedding_cache_instance is None:
+        _embedding_cache_instance = EmbeddingCache(
+            max_size=settings.QUERY_EMBEDDING_CACHE_SIZE
+        )
+    return _embedding_cache_instance
@@ -1,6 +1,7 @@
 # app/worker/logic/generation.py
 from app.services.llm_client import LLMClient  # , get_llm_client
-from typing import List, Dict, Any, Optional
+from app.worker.logic.retrieval import Passage
+from typing import List, Dict, Optional, Callable
 import logging
 from app.core.config import settings
 
@@ -8,104 +9,132 @@ logger = logging.getLogger(__name__)
 
 
 class AnswerGenerator:
+    # Instructions and retrieved context go in the system message, the question in the user
+    # message. The LLM tokenizer's chat template turns them into the model's own instruction
+    # format (e.g. <s>[INST] ... [/INST] for Mistral Instruct), so no special tokens are
+    # hand-written here.
+    SYSTEM_INSTRUCTIONS = (
+        "You are a specialized AI assistant for Ramboll engineers. "
+        "Your task is to answer the technical question below based *only* on the provided context passages. "
+        "Do not use any external knowledge. "
+        "If the context passages do not contain enough information to answer the question, clearly state that. "
+        "When you use information from a passage, try to cite the Source and Chunk ID like this: [Source: <source_id>, Chunk: <chunk_id>]. "
+        "Be concise and factual.\n\n"
+        "--- CONTEXT PASSAGES START ---\n"
+    )
+    CONTEXT_END = "\n--- CONTEXT PASSAGES END ---"
+    QUESTION_PREFIX = "QUESTION: "
+
+    # Fallback instructions if no context
+    NO_CONTEXT_INSTRUCTIONS = (
+        "You are a helpful AI assistant. "
+        "Please answer the following technical question to the best of your ability. "
+        "Since no specific context documents were found, rely on your general knowledge."
+    )
+
     def __init__(self, llm_client: LLMClient):
         self.llm_client = llm_client
+        # Resolved once instead of scanning the model name on every request
+        self._max_new_tokens = (
+            500 if "mistral" in settings.LLM_MODEL_NAME.lower() else 300
+        )  # Mistral can handle longer
+        if self.llm_client and settings.LLM_PREFIX_CACHE_ENABLED:
+            # Every prompt starts with the same instructions; have the LLM client keep
+            # their KV cache (computed once per process, no-op afterwards).
+            self.llm_client.cache_prompt_prefix(
+                self.SYSTEM_INSTRUCTIONS,
+                # Two prompts that diverge at the first passage's source id
+                [
+                    self._construct_prompt(
+                        "?", [Passage("N/A", probe, 0.0, probe, None, "probe")]
+                    )
+                    for probe in ("A", "B")
+                ],
+            )
 
     def _construct_prompt(
-        self, question: str, context_passages: List[Dict[str, Any]]
-    ) -> str:
+        self, question: str, context_passages: List[Passage]
+    ) -> List[Dict[str, str]]:
         """
-        Constructs a detailed prompt for the LLM, including context and instructions.
-        Mistral Instruct models expect a specific format:
-        <s>[INST] Instruction [/INST] Model answer</s>[INST] Follow-up instruction [/INST]
+        Constructs the chat messages for the LLM: instructions plus context as the system
+        message and the question as the user message.
         """
         if not context_passages:
             logger.warning(
                 "No context passages provided for prompt construction. Answer quality may be affected."
             )
-            # Fallback prompt if no context
-            prompt_template = (
-                "<s>[INST] You are a helpful AI assistant. "
-                "Please answer the following technical question to the best of your ability. "
-                "Since no specific context documents were found, rely on your general knowledge. "
-                "Question: {question}\n"
-                "[/INST] Assistant Answer: "
-            )
-            return prompt_template.format(question=question)
-
-        context_str = "\n\n".join(
-            [
-                f"[Context Passage - Source: {p.get('source_id', 'N/A')}, Chunk ID: {p.get('chunk_id', 'N/A')}]\n{p['text']}"
-                for p in context_passages
-            ]
-        )
-
-        # Mistral Instruct Prompt Template
-        # Reference: https://huggingface.co/mistralai/Mistral-7B-Instruct-v0.1#instruction-format
-        # For multi-turn, the pattern is <s>[INST] UserTurn1 [/INST] ModelTurn1</s>[INST] UserTurn2 [/INST]
-        # For single turn RAG:
-        prompt = (
-            "<s>[INST] You are a specialized AI assistant for Ramboll engineers. "
-            "Your task is to answer the technical question below based *only* on the provided context passages. "
-            "Do not use any external knowledge. "
-            "If the context passages do not contain enough information to answer the question, clearly state that. "
-            "When you use information from a passage, try to cite the Source and Chunk ID like this: [Source: <source_id>, Chunk: <chunk_id>]. "
-            "Be concise and factual.\n\n"
-            "--- CONTEXT PASSAGES START ---\n"
-            "{context_str}\n"
-            "--- CONTEXT PASSAGES END ---\n\n"
-            "QUESTION: {question}\n"
-            "[/INST] Assistant Answer based on the provided context: "
-        )
+            system_content = self.NO_CONTEXT_INSTRUCTIONS
+        else:
+            # Assemble the pieces and join once (no intermediate context string or format() pass)
+            parts = [self.SYSTEM_INSTRUCTIONS]
+            for i, p in enumerate(context_passages):
+                if i:
+                    parts.append("\n\n")
+                parts.append(
+                    f"[Context Passage - Source: {p.source_id}, Chunk ID: {p.chunk_id}]\n"
+                )
+                parts.append(p.text)
+            parts.append(self.CONTEXT_END)
+            system_content = "".join(parts)
 
-        # A simpler prompt if the above is too complex or model struggles with it:
-        # prompt = (
-        #     "<s>[INST] Answer the following question based solely on the provided context passages. "
-        #     "Cite sources if possible using [Source: ID]. If the answer is not in the context, say so.\n\n"
-        #     "Context:\n{context_str}\n\n"
-        #     "Question: {question} [/INST]"
-        # )
+        messages = [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": self.QUESTION_PREFIX + question},
+        ]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Constructed LLM system prompt (first 300 chars): {system_content[:300]}..."
+            )
+        return messages
 
-        formatted_prompt = prompt.format(context_str=context_str, question=question)
-        logger.debug(
-            f"Constructed LLM prompt (first 300 chars): {formatted_prompt[:300]}..."
-        )
-        return formatted_prompt
+    def precompute_prefix(self):
+        """
+        Prepares the generation state that doesn't depend on the retrieved passages (a
+        private copy of the prompt-prefix KV cache), so it can run while retrieval is in
+        flight. Pass the result to generate_answer(prefix_state=...).
+        """
+        if not self.llm_client or not settings.LLM_PREFIX_CACHE_ENABLED:
+            return None
+        return self.llm_client.copy_prefix_cache()
 
     def generate_answer(
-        self, question: str, context_passages: List[Dict[str, Any]]
+        self,
+        question: str,
+        context_passages: List[Passage],
+        on_partial_answer: Optional[Callable[[str], None]] = None,
+        prefix_state=None,
     ) -> Optional[str]:
         """
         Generates an answer using the LLM based on the question and retrieved context.
+        If on_partial_answer is given, it is called with the answer text so far while
+        tokens are being generated. prefix_state is an optional result of precompute_prefix().
         """
         if not self.llm_client:
             logger.error("LLMClient is not available in AnswerGenerator.")
             return "Error: LLM service is not available."
 
-        prompt = self._construct_prompt(question, context_passages)
+        messages = self._construct_prompt(question, context_passages)
 
         try:
             # Parameters for generation can be tuned
-            generated_text = self.llm_client.generate_text(
-                prompt,
-                max_new_tokens=settings.LLM_MODEL_NAME.lower().find("mistral") > -1
-                and 500
-                or 300,  # Mistral can handle longer
-                temperature=0.1,  # Factual
+            generated_text = self.llm_client.generate_chat(
+                messages,
+                max_new_tokens=self._max_new_tokens,
+                temperature=0.1,  # Factual (only used when sampling)
                 top_p=0.9,
-                do_sample=True,  # Important for temperature/top_p to have effect
+                # Greedy by default: at T=0.1 sampling gives essentially the greedy answer
+                # but pays for top-p filtering and multinomial sampling on every token.
+                do_sample=not settings.LLM_DETERMINISTIC,
+                on_partial_text=on_partial_answer,
+                prefix_kv=prefix_state,
             )
 
             if generated_text:
-                logger.info(
-                    f"Answer generated successfully for question: '{question[:30]}...'"
-                )
+                logger.info("Answer generated successfully for question: '%.30s...'", question)
                 # Further post-processing can be done here (e.g., cleaning up citations, ensuring factual consistency if possible)
                 return generated_text
             else:
-                logger.warning(
-                    f"LLM returned no text for question: '{question[:30]}...'"
-                )
+                logger.warning("LLM returned no text for question: '%.30s...'", question)
                 return "The language model did not return a response for this question."
         except Exception as e:
             logger.error(f"Error during answer generation: {e}", exc_info=True)
@@ -0,0 +1,79 @@
+# app/worker/logic/query_cache.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL, used in front of the vector DB so
+    repeated questions skip the embedding call and the search round trip.
+    """
+
+    def __init__(self, max_size: int = 2000, ttl_seconds: float = 300.0, log_every: int = 500):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.log_every = log_every  # Log the hit rate every N lookups (0 disables)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (inserted_at, value)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._entries[key] = entry  # Re-insert as most recently used
+                self.hits += 1
+                value = entry[1]
+            else:
+                self.misses += 1  # Absent, or expired (and now dropped)
+                value = None
+            lookups = self.hits + self.misses
+            if self.log_every and lookups % self.log_every == 0:
+                logger.info(
+                    f"Query cache hit rate {self.hits / lookups:.1%} over {lookups} lookups "
+                    f"({len(self._entries)} entries, {self.evictions} evictions)."
+                )
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.max_size:
+                self._entries.popitem(last=False)  # Oldest (least recently used) first
+                self.evictions += 1
+            self._entries[key] = (time.monotonic(), value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def make_query_key(question: str, top_k: int) -> tuple:
+    """Cache key for a question; case and surrounding whitespace don't change the results much."""
+    return (question.strip().lower(), top_k)
+
+
+# Global instance (one per worker process, shared by the per-process HybridRetriever)
+_query_cache_instance: Optional[QueryCache] = None
+
+
+def get_query_cache() -> QueryCache:
+    global _query_cache_instance
+    if _query_cache_instance is None:
+        _query_cache_instance = QueryCache(
+            max_size=settings.QUERY_CACHE_MAX_SIZE,
+            ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS,
+        )
+    return _query_cache_instance
@@ -3,35 +3,103 @@ from app.services.vector_db_client import VectorDBClient  # , get_vector_db_clie
 
 # Keyword search component would be defined here or imported
 # For simplicity, we'll mock keyword search or omit it if focusing on vector search first.
-from typing import List, Dict, Any, Tuple
+from collections import defaultdict
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Tuple, Union
+import heapq
 import logging
 from app.core.config import settings
+from app.worker.logic.query_cache import QueryCache, make_query_key
+from app.worker.logic.embedding_cache import EmbeddingCache, embedding_key
+from app.worker.logic import _fusion_numba
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class Passage:
+    """
+    A retrieved passage, as handed to AnswerGenerator and stored as a job source.
+    Immutable: the same instances can be shared between cache entries and tasks.
+    """
+
+    # Declared by hand (dataclass(slots=True) needs Python 3.10): no per-instance __dict__
+    __slots__ = ("chunk_id", "text", "score", "source_id", "url", "retrieval_method")
+
+    chunk_id: str
+    text: str
+    score: float
+    source_id: str
+    url: Optional[str]
+    retrieval_method: str
+
+
 class HybridRetriever:
-    def __init__(self, vector_db_client: VectorDBClient, top_k: int = 5):
+    def __init__(
+        self,
+        vector_db_client: VectorDBClient,
+        top_k: int = 5,
+        cache: Optional[QueryCache] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+    ):
         self.vector_db_client = vector_db_client
         self.top_k = top_k
+        self.cache = cache  # Optional cache of semantic results shared across retrievers
+        self.embedding_cache = embedding_cache  # Optional cache of query embeddings
         # self.keyword_search_client = ... # Initialize your keyword search client here
 
     def _semantic_search(
         self, question: str
     ) -> List[Tuple[str, float, Dict[str, Any]]]:
         """Performs semantic search using the vector database."""
+        if self.cache is not None:
+            hit = self.cache.get(make_query_key(question, self.top_k))
+            if hit is not None:
+                logger.info("Semantic search for '%.30s...' served from cache.", question)
+                return hit
+        return self._query_vector_db(question)
+
+    def _query_vector_db(
+        self, question: str
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Queries the vector database (no cache lookup) and caches successful results.
+        Raises ConnectionError if the search fails, so callers can tell an outage from a
+        search that found nothing (which returns []).
+        """
         try:
+            query_embedding = None
+            if self.embedding_cache is not None:
+                key = embedding_key(question)
+                query_embedding = self.embedding_cache.get(key)
+                if query_embedding is None:
+                    query_embedding = self.vector_db_client.embed_query(question)
+                    self.embedding_cache.put(key, query_embedding)
             # query_documents returns list of (chunk_id, score, metadata)
             results = self.vector_db_client.query_documents(
-                query_text=question, top_k=self.top_k
+                query_text=question, top_k=self.top_k, query_embedding=query_embedding
             )
             logger.info(
-                f"Semantic search for '{question[:30]}...' returned {len(results)} passages."
+                "Semantic search for '%.30s...' returned %d passages.", question, len(results)
             )
+            if self.cache is not None:
+                # Errors below are never cached
+                self.cache.put(make_query_key(question, self.top_k), results)
             return results
         except Exception as e:
             logger.error(f"Error during semantic search: {e}", exc_info=True)
-            return []
+            raise ConnectionError(f"Semantic search failed: {e}") from e
+
+    def _query_vector_db_or_error(
+        self, question: str
+    ) -> Union[List[Tuple[str, float, Dict[str, Any]]], ConnectionError]:
+        """_query_vector_db for retrieve_passages_batch: a failure is returned, not raised."""
+        try:
+            return self._query_vector_db(question)
+        except ConnectionError as e:
+            return e
 
     def _keyword_search(self, question: str) -> List[Tuple[str, float, Dict[str, Any]]]:
         """
@@ -48,122 +116,137 @@ class HybridRetriever:
         # return results
         return []
 
+    def _rrf_fuse(
+        self,
+        ranked_lists: List[List[Tuple[str, float, Dict[str, Any]]]],
+        k: int = 60,
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Reciprocal Rank Fusion: each chunk scores sum(1 / (k + rank)) over the lists it
+        appears in. Only ranks are used, so raw scores on different scales (cosine vs BM25)
+        never get compared directly.
+
+        Returns the top_k (chunk_id, rrf_score, metadata) tuples, best first.
+        """
+        if _fusion_numba._NUMBA_AVAILABLE:
+            return _fusion_numba.rrf_topk(ranked_lists, k, self.top_k)
+
+        scores: Dict[str, float] = defaultdict(float)
+        metadatas: Dict[str, Dict[str, Any]] = {}  # First-seen metadata per chunk
+        for ranked in ranked_lists:
+            for rank, (chunk_id, _score, metadata) in enumerate(ranked, start=1):
+                scores[chunk_id] += 1.0 / (k + rank)
+                metadatas.setdefault(chunk_id, metadata)  # One lookup; keeps the first seen
+
+        # Partial sort: O(N log top_k) instead of sorting every candidate
+        top = heapq.nlargest(self.top_k, scores.items(), key=itemgetter(1))
+        return [(chunk_id, score, metadatas[chunk_id]) for chunk_id, score in top]
+
     def _combine_and_rerank(
         self,
         semantic_results: List[Tuple[str, float, Dict[str, Any]]],
         keyword_results: List[Tuple[str, float, Dict[str, Any]]],
-    ) -> List[Dict[str, Any]]:
+    ) -> List[Passage]:
         """
-        Combines and re-ranks results from semantic and keyword searches.
-        A simple strategy: prioritize semantic results, then add unique keyword results.
-        A more advanced strategy would use RRF (Reciprocal Rank Fusion) or similar.
+        Combines semantic and keyword results with Reciprocal Rank Fusion (RRF_K setting).
 
-        Returns: List of passage dictionaries, each containing 'text', 'source_id', 'chunk_id', 'score', 'url'.
+        Returns: List of Passages; their 'score' is the fused RRF score.
         """
-        combined_passages: Dict[str, Dict[str, Any]] = (
-            {}
-        )  # Use chunk_id as key to ensure uniqueness
-
-        # Add semantic results
-        for chunk_id, score, metadata in semantic_results:
-            if chunk_id not in combined_passages:
-                # Ensure 'text' is in metadata, if not, it might be an issue with vector_db_client.query_documents
-                passage_text = metadata.get(
-                    "text", f"Text for chunk {chunk_id} not found in metadata."
-                )
-                if passage_text == f"Text for chunk {chunk_id} not found in metadata.":
-                    logger.warning(
-                        f"Missing text for chunk {chunk_id} from semantic search metadata."
-                    )
-
-                combined_passages[chunk_id] = {
-                    "chunk_id": chunk_id,
-                    "text": passage_text,
-                    "score": score,  # Semantic score
-                    "source_id": metadata.get("document_id", "Unknown Source"),
-                    "url": metadata.get("source_url", None),
-                    "retrieval_method": "semantic",
-                }
-
-        # Add keyword results, giving less weight or only adding if not already present
-        for chunk_id, score, metadata in keyword_results:
-            if (
-                chunk_id not in combined_passages
-            ):  # Only add if not found by semantic search
-                passage_text = metadata.get(
-                    "text", f"Text for chunk {chunk_id} not found in metadata."
-                )
-                if passage_text == f"Text for chunk {chunk_id} not found in metadata.":
-                    logger.warning(
-                        f"Missing text for chunk {chunk_id} from keyword search metadata."
-                    )
-
-                combined_passages[chunk_id] = {
-                    "chunk_id": chunk_id,
-                    "text": passage_text,
-                    "score": score,  # Keyword score
-                    "source_id": metadata.get("document_id", "Unknown Source"),
-                    "url": metadata.get("source_url", None),
-                    "retrieval_method": "keyword",
-                }
-            # else: you could update the score if found by both, e.g., boost score
-
-        # Convert to list and sort by score (descending, assuming higher is better)
-        # This simple sort might not be ideal for RRF.
-        sorted_passages = sorted(
-            list(combined_passages.values()), key=lambda p: p["score"], reverse=True
-        )
+        fused = self._rrf_fuse([semantic_results, keyword_results], k=settings.RRF_K)
 
-        logger.info(f"Combined and re-ranked {len(sorted_passages)} unique passages.")
-        return sorted_passages[: self.top_k]
+        combined_passages = [
+            self._materialize(chunk_id, score, metadata, "hybrid")
+            for chunk_id, score, metadata in fused
+        ]
 
-    def retrieve_passages(self, question: str) -> List[Dict[str, Any]]:
+        logger.info(f"Fused {len(combined_passages)} passages with RRF.")
+        return combined_passages
+
+    def retrieve_passages(self, question: str) -> List[Passage]:
         """
         Main method to perform hybrid search and return top-k relevant passages.
-        Each passage is a dict with 'text', 'source_id', 'chunk_id', 'score', 'url'.
+        Each Passage has 'text', 'source_id', 'chunk_id', 'score', 'url'.
         """
-        logger.info(f"Retrieving passages for question: '{question[:50]}...'")
+        logger.info("Retrieving passages for question: '%.50s...'", question)
 
         semantic_results = self._semantic_search(question)
         # keyword_results = self._keyword_search(question) # Enable when implemented
 
         # For now, if keyword search is not implemented, just use semantic results
         # final_passages = self._combine_and_rerank(semantic_results, keyword_results)
+        return self._semantic_passages(question, semantic_results)
 
-        # Simplified: just use semantic results directly if keyword search is mocked
-        final_passages_data = []
-        for chunk_id, score, metadata in semantic_results:
-            passage_text = metadata.get(
-                "text", f"Text for chunk {chunk_id} not found in metadata."
-            )
-            if passage_text == f"Text for chunk {chunk_id} not found in metadata.":
-                logger.warning(
-                    f"Missing text for chunk {chunk_id} from semantic search metadata during final processing."
+    def retrieve_passages_batch(
+        self, questions: List[str]
+    ) -> List[Union[List[Passage], ConnectionError]]:
+        """
+        retrieve_passages for several questions at once. Cached questions are answered
+        inline; the remaining vector DB queries (network-bound) run concurrently on a
+        thread pool. Results are returned in the order of `questions`; a question whose
+        search failed gets its ConnectionError instead of a list, so the others still
+        get their passages.
+        """
+        semantic_results: List[
+            Optional[Union[List[Tuple[str, float, Dict[str, Any]]], ConnectionError]]
+        ] = [None] * len(questions)
+        if self.cache is not None:
+            for i, question in enumerate(questions):
+                semantic_results[i] = self.cache.get(make_query_key(question, self.top_k))
+
+        miss_indices = [i for i, r in enumerate(semantic_results) if r is None]
+        if miss_indices:
+            max_workers = max(1, min(settings.RETRIEVAL_BATCH_THREADS, len(miss_indices)))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                miss_results = executor.map(
+                    self._query_vector_db_or_error, [questions[i] for i in miss_indices]
                 )
+                for i, results in zip(miss_indices, miss_results):
+                    semantic_results[i] = results
 
-            final_passages_data.append(
-                {
-                    "chunk_id": chunk_id,
-                    "text": passage_text,
-                    "score": score,
-                    "source_id": metadata.get(
-                        "document_id", "Unknown Source"
-                    ),  # from ingestion metadata
-                    "url": metadata.get("source_url", None),  # from ingestion metadata
-                    "retrieval_method": "semantic",
-                }
-            )
-
-        # Ensure we only return top_k results even after any combination logic
-        final_passages_data = sorted(
-            final_passages_data, key=lambda p: p["score"], reverse=True
-        )[: self.top_k]
-
+        logger.info(
+            f"Batch retrieval for {len(questions)} questions "
+            f"({len(questions) - len(miss_indices)} served from cache)."
+        )
+        return [
+            results
+            if isinstance(results, ConnectionError)
+            else self._semantic_passages(question, results)
+            for question, results in zip(questions, semantic_results)
+        ]
+
+    def _semantic_passages(
+        self, question: str, semantic_results: List[Tuple[str, float, Dict[str, Any]]]
+    ) -> List[Passage]:
+        """Builds Passages from semantic search results (semantic-only retrieval)."""
+        # The vector DB already returns results best-first, so no re-sort is needed.
+        final_passages_data = [
+            self._materialize(chunk_id, score, metadata, "semantic")
+            for chunk_id, score, metadata in semantic_results[: self.top_k]
+        ]
         if not final_passages_data:
-            logger.warning(f"No passages found for question: '{question[:50]}...'")
-
+            logger.warning("No passages found for question: '%.50s...'", question)
         return final_passages_data
 
+    def _extract_text(self, chunk_id: str, metadata: Dict[str, Any], source: str) -> str:
+        """Passage text from search metadata; the placeholder string is only built when it's missing."""
+        text = metadata.get("text")
+        if text is None:
+            logger.warning(f"Missing text for chunk {chunk_id} in {source} search metadata.")
+            return f"Text for chunk {chunk_id} not found in metadata."
+        return text
+
+    def _materialize(
+        self, chunk_id: str, score: float, metadata: Dict[str, Any], method: str
+    ) -> Passage:
+        """Builds the Passage for a search hit."""
+        return Passage(
+            chunk_id=chunk_id,
+            text=self._extract_text(chunk_id, metadata, method),
+            score=score,
+            source_id=metadata.get("document_id", "Unknown Source"),  # from ingestion metadata
+            url=metadata.get("source_url", None),  # from ingestion metadata
+            retrieval_method=method,
+        )
 
 # To get an instance (can be managed by Celery task context or a global factory)
 # def get_retriever() -> HybridRetriever:
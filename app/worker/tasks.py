@@ -1,17 +1,25 @@
 # app/worker/tasks.py
-from typing import Optional
+from typing import Callable, List, Optional
 from app.worker.celery_app import celery_app
 from app.core.config import settings
 from app.core.logging_config import setup_logging  # Ensure logging is configured
-from app.db.session import SessionLocal  # For creating DB sessions within tasks
+from app.core.metrics import (
+    GENERATION_SECONDS,
+    NO_CONTEXT_ANSWERS,
+    RETRIEVAL_SECONDS,
+    timed,
+)
+from app.db.session import ScopedSession  # Thread-local DB sessions within tasks
 from app.models.job import Job, JobStatus
-from app.services.vector_db_client import get_vector_db_client, VectorDBClient
-from app.services.llm_client import get_llm_client, LLMClient
-from app.worker.logic.retrieval import HybridRetriever
-from app.worker.logic.generation import AnswerGenerator
+from app.services.answer_stream import get_answer_stream_publisher
+from app.worker.logic.retrieval import Passage
+from app.worker.worker_state import init_worker_state
 import logging
+import random
 import time
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import update
 from sqlalchemy.orm import Session as SQLAlchemySession
 
 # It's good practice to ensure logging is set up when the module is loaded by Celery
@@ -26,19 +34,28 @@ def update_job_in_db(
     result_text: Optional[str] = None,
     sources_metadata: Optional[list[dict]] = None,
 ):
-    """Helper function to update job status and result in the database."""
+    """
+    Helper function to update job status and result in the database.
+    Issues a single UPDATE ... WHERE id = :job_id (no SELECT of the row first).
+    """
+    values = {
+        "status": status,
+        "updated_at": datetime.datetime.utcnow(),  # Explicitly set for clarity
+    }
+    if result_text is not None:
+        values["result_text"] = result_text
+    if sources_metadata is not None:
+        values["sources_metadata"] = sources_metadata  # Ensure this is JSON serializable
     try:
-        db_job = db.query(Job).filter(Job.id == job_id).first()
-        if db_job:
-            db_job.status = status
-            if result_text is not None:
-                db_job.result_text = result_text
-            if sources_metadata is not None:
-                db_job.sources_metadata = (
-                    sources_metadata  # Ensure this is JSON serializable
-                )
-            db_job.updated_at = datetime.datetime.utcnow()  # Explicitly set for clarity
-            db.commit()
+        result = db.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(**values)
+            # Tasks don't read the Job object back after updating it
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        if result.rowcount:
             logger.info(
                 f"Job {job_id} status updated to {status}.", extra={"job_id": job_id}
             )
@@ -57,6 +74,77 @@ def update_job_in_db(
         # Depending on the error, you might want to re-raise or handle differently
 
 
+def _sources_for_db(passages: List[Passage]) -> List[dict]:
+    """
+    JSON-serializable sources for Job.sources_metadata, one per retrieved passage.
+    Keys whose value is None (often url) are left out; the API schema defaults them to null.
+    """
+    sources = []
+    for p in passages:  # Only include sources that were actually retrieved
+        source = {
+            "source_id": p.source_id,
+            "chunk_id": p.chunk_id,
+            "relevance_score": p.score,
+            # "retrieved_text_preview": p.text[:100] # Optional: store a preview
+        }
+        if p.url is not None:
+            source["url"] = p.url
+        sources.append(source)
+    return sources
+
+
+def _make_partial_answer_reporter(task, job_id: str):
+    """
+    Returns a callback that publishes the partial answer as the task's PROGRESS state
+    (readable via AsyncResult(job_id).info["partial"]), at most once per
+    PARTIAL_ANSWER_UPDATE_INTERVAL_SECONDS so the result backend isn't written per token.
+    """
+    last_update = 0.0
+
+    def report(partial_text: str):
+        nonlocal last_update
+        now = time.monotonic()
+        if now - last_update < settings.PARTIAL_ANSWER_UPDATE_INTERVAL_SECONDS:
+            return
+        last_update = now
+        task.update_state(
+            task_id=job_id, state="PROGRESS", meta={"job_id": job_id, "partial": partial_text}
+        )
+
+    return report
+
+
+# Upper bound for a single retry delay
+_RETRY_BACKOFF_MAX_SECONDS = 600
+
+
+def _retry_countdown(task) -> float:
+    """
+    Exponential backoff with full jitter: a random delay in [0, default_retry_delay * 2^retries],
+    capped. Spreads out retries of tasks that failed together (e.g. during a vector DB or
+    LLM outage) instead of having them all retry at the same moment.
+    """
+    ceiling = min(
+        task.default_retry_delay * (2 ** task.request.retries), _RETRY_BACKOFF_MAX_SECONDS
+    )
+    return random.uniform(0, ceiling)
+
+
+def _combine_partial_callbacks(
+    callbacks: List[Callable[[str], None]]
+) -> Optional[Callable[[str], None]]:
+    if not callbacks:
+        return None
+    if len(callbacks) == 1:
+        return callbacks[0]
+
+    def combined(partial_text: str):
+        for callback in callbacks:
+            callback(partial_text)
+
+    return combined
+
+
 @celery_app.task(
     bind=True,  # Makes `self` (the task instance) available
     name="app.worker.tasks.process_question_task",  # Explicit name is good practice
@@ -67,29 +155,34 @@ def update_job_in_db(
 def process_question_task(self, job_id: str, question: str):
     """
     Celery task to process a technical question:
-    1. Update job status to PROCESSING.
+    1. Mark the job as started (Celery STARTED state; no DB write).
     2. Perform hybrid retrieval.
     3. Generate answer using LLM.
     4. Update job status to COMPLETED with result, or FAILED.
     """
     # Create a logger adapter to include job_id in all log messages from this task
     task_logger = logging.LoggerAdapter(logger, {"job_id": job_id})
-    task_logger.info(f"Task started for question: '{question[:50]}...'")
+    task_logger.info("Task started for question: '%.50s...'", question)
+    task_start = time.perf_counter()
 
-    db: SQLAlchemySession = SessionLocal()  # Create a new DB session for this task
+    db: SQLAlchemySession = ScopedSession()  # This thread's DB session
+    stream_publisher = None  # Set when answers are also streamed over Redis pub/sub
 
     try:
-        # 1. Update job status to PROCESSING
-        update_job_in_db(db, job_id, JobStatus.PROCESSING)
-        task_logger.info("Job status updated to PROCESSING.")
-
-        # Initialize services (this can raise exceptions if services are unavailable)
-        # These `get_` functions will initialize the clients if they haven't been already.
-        # In a long-running worker, these might be initialized once per worker process.
-        # However, for robustness against transient issues, initializing per task (or with retry) can be safer.
+        # With acks_late, a message can be redelivered after the job was already finished
+        # (e.g. the worker died before acking). The job_id keys the result, so don't redo it.
+        existing_job = db.get(Job, job_id)
+        if existing_job is not None and existing_job.status == JobStatus.COMPLETED:
+            task_logger.info("Job already COMPLETED; skipping redelivered task.")
+            return {"job_id": job_id, "status": "COMPLETED", "skipped": True}
+
+        # 1. PROCESSING is not written to the DB: with task_track_started the task is
+        # STARTED in the result backend, and the API reports that as PROCESSING.
+
+        # The retriever/generator (and their clients) are built once per worker process;
+        # this only initializes them if warm-up didn't (and raises if a service is down).
         try:
-            vector_db_client: VectorDBClient = get_vector_db_client()
-            llm_client: LLMClient = get_llm_client()
+            retriever, answer_generator = init_worker_state()
         except ConnectionError as conn_err:
             task_logger.error(
                 f"Failed to connect to dependent services: {conn_err}", exc_info=True
@@ -117,36 +210,57 @@ def process_question_task(self, job_id: str, question: str):
             )
             raise
 
-        retriever = HybridRetriever(
-            vector_db_client=vector_db_client, top_k=settings.RETRIEVAL_TOP_K
-        )
-        answer_generator = AnswerGenerator(llm_client=llm_client)
-
         # 2. Perform hybrid retrieval
+        task_logger.info("Starting passage retrieval for question: '%.50s...'", question)
+        # Copy the prompt-prefix KV cache on a helper thread while retrieval waits on the
+        # vector DB; neither depends on the other.
+        with timed(RETRIEVAL_SECONDS) as retrieval_timer, ThreadPoolExecutor(
+            max_workers=1
+        ) as executor:
+            prefix_future = executor.submit(answer_generator.precompute_prefix)
+            retrieved_passages = retriever.retrieve_passages(question)  # List of Passages
+            try:
+                prefix_state = prefix_future.result()
+            except Exception as e:  # Only an optimization; generate_answer copies it itself
+                task_logger.warning(f"Prompt prefix precomputation failed: {e}")
+                prefix_state = None
         task_logger.info(
-            f"Starting passage retrieval for question: '{question[:50]}...'"
-        )
-        start_time_retrieval = time.time()
-        retrieved_passages = retriever.retrieve_passages(question)  # List of dicts
-        retrieval_duration = time.time() - start_time_retrieval
-        task_logger.info(
-            f"Passage retrieval completed in {retrieval_duration:.2f}s. Found {len(retrieved_passages)} passages."
+            "Passage retrieval completed in %.2fs. Found %d passages.",
+            retrieval_timer.seconds,
+            len(retrieved_passages),
         )
 
         if not retrieved_passages:
-            task_logger.warning(
-                "No passages retrieved. Proceeding to generate answer without specific context."
+            # The search ran and found nothing to ground an answer in (a failed search
+            # raises ConnectionError and is retried): store the canned answer instead of
+            # spending an LLM call on it. Counted rather than logged as a warning per task.
+            NO_CONTEXT_ANSWERS.inc()
+            update_job_in_db(
+                db,
+                job_id,
+                JobStatus.COMPLETED,
+                result_text=settings.NO_CONTEXT_ANSWER,
+                sources_metadata=[],
             )
-            # An alternative here could be to fail the job or return a specific message.
+            task_logger.info("No passages retrieved; job completed with the no-context answer.")
+            return {"job_id": job_id, "status": "COMPLETED", "no_context": True}
 
         # 3. Generate answer using LLM
         task_logger.info("Starting answer generation...")
-        start_time_generation = time.time()
-        generated_answer = answer_generator.generate_answer(
-            question, retrieved_passages
-        )
-        generation_duration = time.time() - start_time_generation
-        task_logger.info(f"Answer generation completed in {generation_duration:.2f}s.")
+        partial_callbacks = []
+        if settings.LLM_STREAM_PARTIAL_ANSWERS:
+            partial_callbacks.append(_make_partial_answer_reporter(self, job_id))
+        if settings.ANSWER_STREAM_PUBSUB_ENABLED:
+            stream_publisher = get_answer_stream_publisher(job_id)
+            partial_callbacks.append(stream_publisher.on_partial_answer)
+        with timed(GENERATION_SECONDS) as generation_timer:
+            generated_answer = answer_generator.generate_answer(
+                question,
+                retrieved_passages,
+                on_partial_answer=_combine_partial_callbacks(partial_callbacks),
+                prefix_state=prefix_state,
+            )
+        task_logger.info("Answer generation completed in %.2fs.", generation_timer.seconds)
 
         if generated_answer is None:
             task_logger.error("Answer generation failed or returned None.")
@@ -163,17 +277,7 @@ def process_question_task(self, job_id: str, question: str):
             )  # To trigger potential retry
 
         # Prepare sources metadata for DB storage from retrieved_passages
-        # The 'retrieved_passages' are dicts: {'chunk_id', 'text', 'score', 'source_id', 'url'}
-        sources_for_db = [
-            {
-                "source_id": p.get("source_id"),
-                "chunk_id": p.get("chunk_id"),
-                "relevance_score": p.get("score"),
-                "url": p.get("url"),
-                # "retrieved_text_preview": p.get("text", "")[:100] # Optional: store a preview
-            }
-            for p in retrieved_passages  # Only include sources that were actually retrieved
-        ]
+        sources_for_db = _sources_for_db(retrieved_passages)
 
         # 4. Update job status to COMPLETED with result
         update_job_in_db(
@@ -184,10 +288,10 @@ def process_question_task(self, job_id: str, question: str):
             sources_metadata=sources_for_db,
         )
         task_logger.info("Job successfully completed.")
+        if stream_publisher is not None:  # Subscribers can now fetch the stored result
+            stream_publisher.publish_done(JobStatus.COMPLETED.value)
 
-        total_processing_time = (
-            time.time() - start_time_retrieval
-        )  # Rough estimate, better to track from task start
+        total_processing_time = time.perf_counter() - task_start
         return {
             "job_id": job_id,
             "status": "COMPLETED",
@@ -206,8 +310,8 @@ def process_question_task(self, job_id: str, question: str):
             )
             raise self.retry(
                 exc=exc,
-                countdown=int(self.default_retry_delay * (self.request.retries + 1)),
-            )  # Exponential backoff basic
+                countdown=_retry_countdown(self),
+            )
         except self.MaxRetriesExceededError:
             task_logger.error("Max retries exceeded for task after ConnectionError.")
             update_job_in_db(
@@ -225,6 +329,8 @@ def process_question_task(self, job_id: str, question: str):
         # Update job status to FAILED in DB
         error_message = f"Processing error: {str(exc)}"
         update_job_in_db(db, job_id, JobStatus.FAILED, result_text=error_message)
+        if stream_publisher is not None:
+            stream_publisher.publish_done(JobStatus.FAILED.value)
 
         # Retry the task for generic exceptions as well, if configured
         try:
@@ -234,7 +340,7 @@ def process_question_task(self, job_id: str, question: str):
             # This will use Celery's retry mechanism based on task decorator args
             raise self.retry(
                 exc=exc,
-                countdown=int(self.default_retry_delay * (self.request.retries + 1)),
+                countdown=_retry_countdown(self),
             )
         except self.MaxRetriesExceededError:
             task_logger.error(
@@ -255,5 +361,125 @@ def process_question_task(self, job_id: str, question: str):
             }
 
     finally:
-        db.close()  # Ensure DB session is closed
+        ScopedSession.remove()  # Close the session and return its connection to the pool
         task_logger.info("Task finished.")
+
+
+@celery_app.task(
+    bind=True,
+    name="app.worker.tasks.process_question_batch_task",
+    acks_late=True,
+)
+def process_question_batch_task(self, jobs: List[List[str]]):
+    """
+    Processes several already-created jobs in one task: `jobs` is a list of
+    [job_id, question] pairs (e.g. a bulk question import). Retrieval for the whole
+    batch runs concurrently (HybridRetriever.retrieve_passages_batch); answers are then
+    generated one job at a time, since all jobs share the worker's single local model.
+    A failure marks only the affected job FAILED; the rest of the batch continues.
+    """
+    batch_logger = logging.LoggerAdapter(logger, {"job_id": None})
+    batch_logger.info(f"Batch task started for {len(jobs)} jobs.")
+    results = []
+
+    db: SQLAlchemySession = ScopedSession()  # One session for every job in the batch
+    try:
+        pending = []
+        for job_id, question in jobs:
+            existing_job = db.get(Job, job_id)
+            if existing_job is not None and existing_job.status == JobStatus.COMPLETED:
+                results.append({"job_id": job_id, "status": "COMPLETED", "skipped": True})
+                continue
+            update_job_in_db(db, job_id, JobStatus.PROCESSING)
+            pending.append((job_id, question))
+        if not pending:
+            return results
+
+        try:
+            retriever, answer_generator = init_worker_state()
+        except Exception as service_init_err:
+            batch_logger.error(
+                f"Failed to initialize services for batch: {service_init_err}",
+                exc_info=True,
+            )
+            for job_id, _ in pending:
+                update_job_in_db(
+                    db,
+                    job_id,
+                    JobStatus.FAILED,
+                    result_text=f"Service initialization error: {service_init_err}",
+                )
+                results.append(
+                    {"job_id": job_id, "status": "FAILED", "error": str(service_init_err)}
+                )
+            return results
+
+        start_time_retrieval = time.perf_counter()
+        passages_per_job = retriever.retrieve_passages_batch(
+            [question for _, question in pending]
+        )
+        # Not observed on RETRIEVAL_SECONDS, which is per question
+        batch_logger.info(
+            "Batch retrieval for %d jobs completed in %.2fs.",
+            len(pending),
+            time.perf_counter() - start_time_retrieval,
+        )
+
+        for (job_id, question), retrieved_passages in zip(pending, passages_per_job):
+            task_logger = logging.LoggerAdapter(logger, {"job_id": job_id})
+            if isinstance(retrieved_passages, ConnectionError):  # Search failed, not empty
+                update_job_in_db(
+                    db,
+                    job_id,
+                    JobStatus.FAILED,
+                    result_text=f"Service connection error: {retrieved_passages}",
+                )
+                results.append(
+                    {"job_id": job_id, "status": "FAILED", "error": str(retrieved_passages)}
+                )
+                continue
+            if not retrieved_passages:  # Same short-circuit as process_question_task
+                NO_CONTEXT_ANSWERS.inc()
+                update_job_in_db(
+                    db,
+                    job_id,
+                    JobStatus.COMPLETED,
+                    result_text=settings.NO_CONTEXT_ANSWER,
+                    sources_metadata=[],
+                )
+                results.append({"job_id": job_id, "status": "COMPLETED", "no_context": True})
+                continue
+            try:
+                with timed(GENERATION_SECONDS):
+                    generated_answer = answer_generator.generate_answer(
+                        question,
+                        retrieved_passages,
+                        on_partial_answer=(
+                            _make_partial_answer_reporter(self, job_id)
+                            if settings.LLM_STREAM_PARTIAL_ANSWERS
+                            else None
+                        ),
+                    )
+                if generated_answer is None:
+                    raise Exception("LLM answer generation returned None")
+                sources_for_db = _sources_for_db(retrieved_passages)
+                update_job_in_db(
+                    db,
+                    job_id,
+                    JobStatus.COMPLETED,
+                    result_text=generated_answer,
+                    sources_metadata=sources_for_db,
+                )
+                results.append({"job_id": job_id, "status": "COMPLETED"})
+            except Exception as exc:
+                task_logger.error(f"Failed to process job in batch: {exc}", exc_info=True)
+                update_job_in_db(
+                    db, job_id, JobStatus.FAILED, result_text=f"Processing error: {exc}"
+                )
+                results.append({"job_id": job_id, "status": "FAILED", "error": str(exc)})
+
+        return results
+
+    finally:
+        ScopedSession.remove()
+        batch_logger.info("Batch task finished.")
@@ -0,0 +1,49 @@
+# app/worker/worker_state.py
+# Pipeline objects shared by every task in a worker process. Built once, by the
+# worker_process_init hook in celery_app.py or lazily by the first task, instead of per task.
+import logging
+import threading
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.services.llm_client import get_llm_client
+from app.services.vector_db_client import get_vector_db_client
+from app.worker.logic.generation import AnswerGenerator
+from app.worker.logic.embedding_cache import get_embedding_cache
+from app.worker.logic.query_cache import get_query_cache
+from app.worker.logic.retrieval import HybridRetriever
+
+logger = logging.getLogger(__name__)
+
+retriever: Optional[HybridRetriever] = None
+answer_generator: Optional[AnswerGenerator] = None
+_state_lock = threading.Lock()
+
+
+def init_worker_state() -> Tuple[HybridRetriever, AnswerGenerator]:
+    """
+    Returns this process's (retriever, answer_generator), creating them on first use.
+    Raises ConnectionError (from the client getters) if a dependent service is down;
+    nothing is cached in that case, so the next task tries again.
+    """
+    global retriever, answer_generator
+    if retriever is None or answer_generator is None:
+        with _state_lock:
+            if retriever is None or answer_generator is None:
+                vector_db_client = get_vector_db_client()
+                llm_client = get_llm_client()
+                new_retriever = HybridRetriever(
+                    vector_db_client=vector_db_client,
+                    top_k=settings.RETRIEVAL_TOP_K,
+                    cache=get_query_cache() if settings.QUERY_CACHE_ENABLED else None,
+                    embedding_cache=(
+                        get_embedding_cache()
+                        if settings.QUERY_EMBEDDING_CACHE_ENABLED
+                        else None
+                    ),
+                )
+                # Also builds the shared prompt-prefix KV cache (once per process)
+                answer_generator = AnswerGenerator(llm_client=llm_client)
+                retriever = new_retriever
+                logger.info("Worker retrieval/generation pipeline initialized.")
+    return retriever, answer_generator
@@ -1,18 +1,69 @@
 # data_ingestion/ingest.py
+import argparse
+import functools
 import logging
+import multiprocessing
+import os
+import queue
+import re
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from itertools import islice
 from app.core.config import settings
 from app.core.logging_config import setup_logging
 from app.services.vector_db_client import (
-    VectorDBClient,
-)  # Using the same client as worker
+    create_vector_db_client,
+)  # Using the same client as worker (Chroma, USearch or FAISS per VECTOR_DB_IMPL)
 
 # If storing metadata/chunks in PostgreSQL:
 # from app.db.session import SessionLocal
 # from app.models.chunk_metadata import ChunkMetadata # A new model if storing chunks in PG
 
+import numpy as np
+import pyarrow as pa  # Installed with datasets
+import torch
 from datasets import load_dataset, Dataset
-from sentence_transformers import SentenceTransformer  # For chunking by tokens
-from typing import List, Dict, Any, Iterator, Optional
+from transformers import AutoTokenizer  # Fast (Rust) tokenizer for chunking by tokens
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+# Let the Rust tokenizer use all cores for batch encoding (respects an explicit setting)
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "true")
+
+# Articles per tokenizer call in load_and_chunk_data
+_ARTICLE_BATCH_SIZE = 64
+# Articles per preprocess_wikipedia_article call (Dataset.map batches)
+_PREPROCESS_BATCH_SIZE = 256
+# Prepared batches waiting for a vector DB consumer thread (bounds memory use)
+_INGEST_QUEUE_SIZE = 4
+# How often a producer blocked on the full queue checks that consumers are still alive
+_INGEST_QUEUE_PUT_TIMEOUT_SECONDS = 1.0
+# Chunks are embedded in super-batches of batch_size * this, sorted by token length
+_SMART_BATCH_FACTOR = 8
+# Rows per record batch in the --cache-chunks Arrow file
+_CHUNK_CACHE_BATCH_ROWS = 10_000
+# Columns of the --cache-chunks file: chunk id and text plus the chunk metadata fields
+_CHUNK_CACHE_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("text", pa.string()),
+        ("document_id", pa.string()),
+        ("source_url", pa.string()),
+        ("original_text_length_tokens", pa.int32()),
+        ("chunk_index", pa.int32()),
+        ("chunk_length_tokens", pa.int32()),
+    ]
+)
+
+# A line break plus the whitespace around it (trailing spaces, blank lines, the next
+# line's indentation). Replacing each match with "\n" and stripping the result strips
+# every line and drops the empty ones in a single pass.
+_LINE_BREAK_RE = re.compile(r"[^\S\r\n]*[\r\n]\s*")
 
 # Setup logging for the script
 setup_logging()
@@ -20,10 +71,19 @@ logger = logging.getLogger(__name__)
 logger.setLevel(settings.LOG_LEVEL)  # Ensure script log level matches settings
 
 # --- Text Splitting Logic ---
-# Using a simple text splitter based on sentence-transformers tokenizer
+# Using a simple text splitter based on the embedding model's tokenizer
 # For more advanced splitting, consider LangChain's RecursiveCharacterTextSplitter
 
 
+@functools.lru_cache(maxsize=4)
+def _get_fast_tokenizer(model_name: str):
+    """
+    The embedding model's tokenizer alone (no model weights), loaded once per process
+    and shared by every splitter built for the same model.
+    """
+    return AutoTokenizer.from_pretrained(model_name, use_fast=True)
+
+
 class SimpleTokenTextSplitter:
     def __init__(
         self,
@@ -31,9 +91,14 @@ class SimpleTokenTextSplitter:
         chunk_size: int = settings.CHUNK_SIZE,
         chunk_overlap: int = settings.CHUNK_OVERLAP,
     ):
-        self.tokenizer = SentenceTransformer(
-            model_name
-        ).tokenizer  # Access underlying tokenizer
+        # The embedding model's own tokenizer, loaded directly as the Rust-backed fast
+        # tokenizer: it encodes whole batches natively and returns character offsets.
+        self.model_name = model_name
+        self.tokenizer = _get_fast_tokenizer(model_name)
+        if not self.tokenizer.is_fast:  # Offset mappings are only available from fast tokenizers
+            raise ValueError(
+                f"Model '{model_name}' has no fast tokenizer; chunking needs offset mappings."
+            )
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         logger.info(
@@ -43,25 +108,71 @@ class SimpleTokenTextSplitter:
     def split_text(
         self, text: str, document_id: str, source_url: Optional[str]
     ) -> List[Dict[str, Any]]:
-        if not text or not text.strip():
+        return self.split_batch(
+            [{"text": text, "document_id": document_id, "url": source_url}]
+        )
+
+    def split_batch(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Splits a batch of preprocessed articles ({'text', 'document_id', 'url'}) into chunks
+        with one tokenizer call. Chunk text is sliced from the original article by character
+        offsets, so it keeps the source's casing and spacing (no decode round-trip).
+        """
+        articles = [a for a in articles if a["text"] and a["text"].strip()]
+        if not articles:
             return []
 
-        tokens = self.tokenizer.encode(text)
+        encodings = self.tokenizer(
+            [a["text"] for a in articles],
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )
+        chunks = []
+        for article, offsets in zip(articles, encodings["offset_mapping"]):
+            chunks.extend(
+                self._chunks_from_offsets(
+                    article["text"], offsets, article["document_id"], article["url"]
+                )
+            )
+        return chunks
+
+    def _window_starts(self, num_tokens: int) -> range:
+        """
+        Start token of every chunk window, computed up front: windows advance by
+        chunk_size - overlap and the last one is the first that reaches the end of the text.
+        """
+        if num_tokens == 0:
+            return range(0)
+        step = self.chunk_size - self.chunk_overlap
+        if not 0 < step <= self.chunk_size:  # Ensure progress if overlap is large or negative
+            step = self.chunk_size
+        return range(0, max(num_tokens - self.chunk_size, 0) + step, step)
+
+    def _chunks_from_offsets(
+        self,
+        text: str,
+        offsets: List[Tuple[int, int]],
+        document_id: str,
+        source_url: Optional[str],
+    ) -> List[Dict[str, Any]]:
+        num_tokens = len(offsets)
         chunks = []
-        current_pos = 0
         chunk_index = 0
+        # Fields shared by every chunk of this document, computed once
+        base_metadata = {
+            "document_id": document_id,  # Original document ID (e.g., article title)
+            "source_url": source_url or f"wikipedia_article_{document_id.replace(' ', '_')}",
+            "original_text_length_tokens": num_tokens,  # Length of the original document in tokens
+        }
 
-        while current_pos < len(tokens):
-            end_pos = min(current_pos + self.chunk_size, len(tokens))
-            chunk_tokens = tokens[current_pos:end_pos]
+        chunk_size = self.chunk_size  # Local for the per-chunk loop
+        for current_pos in self._window_starts(num_tokens):
+            end_pos = min(current_pos + chunk_size, num_tokens)
 
-            # Decode tokens back to text for the current chunk
-            # Ensure skip_special_tokens=True if the tokenizer adds them and they are not desired in the chunk text
-            chunk_text = self.tokenizer.decode(
-                chunk_tokens,
-                skip_special_tokens=True,
-                clean_up_tokenization_spaces=True,
-            ).strip()
+            # Text covered by tokens [current_pos, end_pos) in the original string
+            chunk_text = text[offsets[current_pos][0] : offsets[end_pos - 1][1]].strip()
 
             if chunk_text:  # Only add non-empty chunks
                 chunk_id = f"{document_id}_chunk_{chunk_index}"
@@ -70,110 +181,178 @@ class SimpleTokenTextSplitter:
                         "id": chunk_id,  # This will be the ID in ChromaDB
                         "text": chunk_text,
                         "metadata": {
-                            "document_id": document_id,  # Original document ID (e.g., article title)
+                            **base_metadata,
                             "chunk_index": chunk_index,
-                            "source_url": source_url
-                            or f"wikipedia_article_{document_id.replace(' ', '_')}",
-                            "original_text_length_tokens": len(
-                                tokens
-                            ),  # Length of the original document in tokens
-                            "chunk_length_tokens": len(chunk_tokens),
+                            "chunk_length_tokens": end_pos - current_pos,
                         },
                     }
                 )
                 chunk_index += 1
 
-            if end_pos == len(tokens):  # Reached the end of the text
-                break
-
-            # Move current_pos forward by chunk_size minus overlap
-            current_pos += self.chunk_size - self.chunk_overlap
-            if (
-                current_pos >= end_pos
-            ):  # Ensure progress if overlap is large or chunk_size is small
-                current_pos = end_pos
-
         if not chunks:
             logger.warning(
-                f"No chunks created for document_id: {document_id}. Original text length: {len(text)} chars, {len(tokens)} tokens."
+                f"No chunks created for document_id: {document_id}. Original text length: {len(text)} chars, {num_tokens} tokens."
             )
         else:
             logger.debug(f"Split document {document_id} into {len(chunks)} chunks.")
         return chunks
 
 
-def preprocess_wikipedia_article(article: Dict[str, Any]) -> Dict[str, Any]:
+def preprocess_wikipedia_article(batch: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
     """
-    Basic preprocessing for a Wikipedia article from the dataset.
+    Basic preprocessing for a batch of Wikipedia articles from the dataset
+    (Dataset.map(batched=True) contract: columns in, columns out).
     The rahular/simple-wikipedia dataset has 'title', 'text', 'url', 'id'.
     'text' contains the main content, often with section headers like '== Section Title =='.
+    Rows are never dropped here; articles left with empty text are skipped when chunking.
     """
-    title = article.get("title", "Unknown Title")
-    text_content = article.get("text", "")
-    url = article.get("url", "")
+    num_rows = len(next(iter(batch.values()), []))
+    titles = [title or "Unknown Title" for title in batch.get("title") or ["Unknown Title"] * num_rows]
+    texts = batch.get("text") or [""] * num_rows
+    urls = batch.get("url") or [""] * num_rows
 
     # Basic cleaning: remove excessive newlines, leading/trailing whitespace
-    text_content = "\n".join(
-        [line.strip() for line in text_content.splitlines() if line.strip()]
-    )
-    text_content = text_content.strip()
+    cleaned_texts = [
+        _LINE_BREAK_RE.sub("\n", text_content or "").strip() for text_content in texts
+    ]
 
     # You might want to remove section headers or handle them specifically
     # For now, we'll keep them as part of the text.
 
     return {
-        "document_id": title.replace(" ", "_").lower(),  # Create a usable ID from title
-        "title": title,
-        "text": text_content,
-        "url": url,
+        "document_id": [title.replace(" ", "_").lower() for title in titles],  # Usable IDs from titles
+        "title": titles,
+        "text": cleaned_texts,
+        "url": urls,
     }
 
 
+# Splitter of a chunking worker process (see _split_in_processes)
+_worker_text_splitter: Optional[SimpleTokenTextSplitter] = None
+
+
+def _init_split_worker(model_name: str, chunk_size: int, chunk_overlap: int):
+    global _worker_text_splitter
+    # Parallelism comes from the process pool; one tokenizer thread per process avoids
+    # oversubscribing the cores.
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    _worker_text_splitter = SimpleTokenTextSplitter(
+        model_name=model_name, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+
+
+def _split_in_worker(articles: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+    return len(articles), _worker_text_splitter.split_batch(articles)
+
+
+def _split_in_processes(
+    article_batches: Iterator[List[Dict[str, Any]]],
+    text_splitter: SimpleTokenTextSplitter,
+    num_workers: int,
+) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    Tokenizes and chunks article batches in `num_workers` processes (the chunking loop
+    and metadata construction are Python and hold the GIL). Yields (articles, chunks)
+    per batch in completion order. At most 2 batches per worker are in flight, so a
+    streamed dataset is not read ahead into memory.
+    """
+    # spawn: the ingestion process already runs consumer threads and has torch loaded,
+    # neither of which is safe to fork.
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_split_worker,
+        initargs=(text_splitter.model_name, text_splitter.chunk_size, text_splitter.chunk_overlap),
+    ) as pool:
+        pending = set()
+        for articles in article_batches:
+            pending.add(pool.submit(_split_in_worker, articles))
+            if len(pending) >= num_workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+
+def _article_batches(dataset) -> Iterator[List[Dict[str, Any]]]:
+    """Preprocessed column batches as lists of {'document_id', 'text', 'url'} articles."""
+    for batch in dataset.iter(batch_size=_ARTICLE_BATCH_SIZE):
+        articles = []
+        for document_id, title, text, url in zip(
+            batch["document_id"], batch["title"], batch["text"], batch["url"]
+        ):
+            if not text:
+                logger.warning(f"Skipping article '{title}' due to empty text content.")
+                continue
+            articles.append({"document_id": document_id, "text": text, "url": url})
+        yield articles
+
+
 def load_and_chunk_data(
     dataset_name: str,
     text_splitter: SimpleTokenTextSplitter,
     limit: Optional[int] = None,
+    streaming: bool = True,
+    split_workers: int = 1,
 ) -> Iterator[Dict[str, Any]]:
     """
     Loads data from Hugging Face datasets, preprocesses, and splits it into chunks.
     Yields one chunk at a time to manage memory.
+
+    With streaming (the default) articles are read lazily and preprocessed batch by batch
+    as they arrive; otherwise the split is downloaded first and preprocessed on all cores.
+    With split_workers > 1 articles are tokenized and chunked in that many processes.
     """
-    logger.info(f"Loading dataset: {dataset_name}")
+    logger.info(f"Loading dataset: {dataset_name} (streaming={streaming})")
     try:
-        # Load a small portion for testing if limit is set
-        split_str = f"train[:{limit}]" if limit else "train"
-        dataset: Dataset = load_dataset(
-            dataset_name, split=split_str, trust_remote_code=True
-        )  # Added trust_remote_code
-        logger.info(
-            f"Dataset '{dataset_name}' loaded with {len(dataset)} articles (after limit)."
-        )
+        if streaming:
+            dataset = load_dataset(
+                dataset_name, split="train", streaming=True, trust_remote_code=True
+            )  # Added trust_remote_code
+            if limit:  # Load a small portion for testing if limit is set
+                dataset = dataset.take(limit)
+            dataset = dataset.map(
+                preprocess_wikipedia_article, batched=True, batch_size=_PREPROCESS_BATCH_SIZE
+            )
+            logger.info(f"Streaming dataset '{dataset_name}' opened.")
+        else:
+            split_str = f"train[:{limit}]" if limit else "train"
+            dataset: Dataset = load_dataset(
+                dataset_name, split=split_str, trust_remote_code=True
+            )
+            dataset = dataset.map(
+                preprocess_wikipedia_article,
+                batched=True,
+                batch_size=_PREPROCESS_BATCH_SIZE,
+                num_proc=os.cpu_count(),
+            )
+            logger.info(
+                f"Dataset '{dataset_name}' loaded with {len(dataset)} articles (after limit)."
+            )
     except Exception as e:
         logger.error(f"Failed to load dataset {dataset_name}: {e}", exc_info=True)
         return  # Stop iteration
 
     processed_articles = 0
     total_chunks_yielded = 0
-    for article in dataset:
-        processed_article = preprocess_wikipedia_article(article)
-        if not processed_article["text"]:
-            logger.warning(
-                f"Skipping article '{processed_article['title']}' due to empty text content."
-            )
-            continue
-
-        chunks = text_splitter.split_text(
-            text=processed_article["text"],
-            document_id=processed_article["document_id"],
-            source_url=processed_article["url"],
+    # Preprocessed column batches, tokenized with one call per batch
+    article_batches = _article_batches(dataset)
+    if split_workers > 1:
+        split_results = _split_in_processes(article_batches, text_splitter, split_workers)
+    else:
+        split_results = (
+            (len(articles), text_splitter.split_batch(articles)) for articles in article_batches
         )
 
+    for batch_articles, chunks in split_results:
         for chunk_data in chunks:
             yield chunk_data  # chunk_data is {'id': str, 'text': str, 'metadata': dict}
-            total_chunks_yielded += 1
+        total_chunks_yielded += len(chunks)
 
-        processed_articles += 1
-        if processed_articles % 100 == 0:  # Log progress every 100 articles
+        previous_count = processed_articles
+        processed_articles += batch_articles
+        if processed_articles // 100 > previous_count // 100:  # Log progress every 100 articles
             logger.info(
                 f"Processed {processed_articles} articles, yielded {total_chunks_yielded} chunks so far..."
             )
@@ -183,17 +362,278 @@ def load_and_chunk_data(
     )
 
 
-def run_ingestion(batch_size: int = 100, article_limit: Optional[int] = None):
+def _chunk_cache_params(
+    dataset_name: str,
+    article_limit: Optional[int],
+    model_name: str,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> Dict[str, str]:
+    """Settings that determine the chunked corpus; stored in the cache file's schema metadata."""
+    return {
+        "dataset_name": dataset_name,
+        "article_limit": str(article_limit) if article_limit else "all",
+        "model_name": model_name,  # Its tokenizer defines the token windows
+        "chunk_size": str(chunk_size),
+        "chunk_overlap": str(chunk_overlap),
+    }
+
+
+def _chunk_cache_matches(path: str, cache_params: Dict[str, str]) -> bool:
+    """Whether `path` holds a complete chunk cache written with exactly these settings."""
+    try:
+        with pa.memory_map(path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+    return {k.decode(): v.decode() for k, v in metadata.items()} == cache_params
+
+
+def _write_chunk_cache(
+    chunk_iterator: Iterator[Dict[str, Any]], path: str, cache_params: Dict[str, str]
+) -> Iterator[Dict[str, Any]]:
+    """
+    Passes chunks through while writing them to an LZ4-compressed Arrow IPC file, in
+    record batches of _CHUNK_CACHE_BATCH_ROWS, with `cache_params` as schema metadata.
+    The file is written under a temporary name and only moved to `path` once the whole
+    corpus was chunked, so an interrupted run never leaves a truncated cache behind.
+    """
+    partial_path = f"{path}.partial"
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    schema = _CHUNK_CACHE_SCHEMA.with_metadata(cache_params)
+    rows: List[Dict[str, Any]] = []
+    total_rows = 0
+    completed = False
+    writer = pa.ipc.new_file(
+        partial_path,
+        schema,
+        options=pa.ipc.IpcWriteOptions(compression="lz4"),
+    )
+    try:
+        for chunk_data in chunk_iterator:
+            rows.append(
+                {"id": chunk_data["id"], "text": chunk_data["text"], **chunk_data["metadata"]}
+            )
+            if len(rows) >= _CHUNK_CACHE_BATCH_ROWS:
+                writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+                total_rows += len(rows)
+                rows = []
+            yield chunk_data
+        if rows:
+            writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+            total_rows += len(rows)
+        completed = total_rows > 0  # Don't cache an empty corpus (e.g. dataset load failed)
+    finally:
+        writer.close()
+        if completed:
+            os.replace(partial_path, path)
+            logger.info(f"Cached {total_rows} chunks in {path}.")
+        else:
+            os.remove(partial_path)
+
+
+def _read_chunk_cache(path: str) -> Iterator[Dict[str, Any]]:
+    """Chunks from a file written by _write_chunk_cache, memory-mapped, batch by batch."""
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            for row in reader.get_batch(i).to_pylist():
+                chunk_id = row.pop("id")
+                chunk_text = row.pop("text")
+                yield {"id": chunk_id, "text": chunk_text, "metadata": row}
+
+
+def _length_sorted_batch(
+    chunks: List[Dict[str, Any]]
+) -> Tuple[List[str], List[Dict[str, Any]], List[str]]:
+    """
+    (documents, metadatas, ids) for the chunks, ordered by token length so each
+    embedding mini-batch holds similarly sized chunks and pads little ("smart batching").
+    Documents, metadatas and IDs are permuted together, so no inverse permutation is needed.
+    """
+    chunks.sort(key=lambda c: c["metadata"]["chunk_length_tokens"])
+    return (
+        [c["text"] for c in chunks],
+        [c["metadata"] for c in chunks],
+        [c["id"] for c in chunks],
+    )
+
+
+def _batch_chunks(
+    chunk_iterator: Iterator[Dict[str, Any]], batch_size: int
+) -> Iterator[Tuple[List[str], List[Dict[str, Any]], List[str]]]:
+    """Groups chunks into length-sorted (documents, metadatas, ids) super-batches."""
+    chunk_iterator = iter(chunk_iterator)
+    while True:
+        # islice fills the batch in C; the last one holds any remaining chunks
+        batch = list(islice(chunk_iterator, batch_size))
+        if not batch:
+            return
+        yield _length_sorted_batch(batch)
+
+
+def _embed_unique(vector_db_client, documents: List[str]) -> np.ndarray:
+    """
+    Embeds each distinct text once and scatters the vectors back to every occurrence.
+    Templated boilerplate (reference sections, stub notices) yields identical chunks
+    across articles, and encode() is the dominant ingestion cost.
+    """
+    unique_index: Dict[str, int] = {}
+    inverse = [unique_index.setdefault(text, len(unique_index)) for text in documents]
+    if len(unique_index) == len(documents):  # No duplicates in this batch
+        return np.asarray(vector_db_client.embed_documents(documents))
+
+    logger.debug(
+        f"Embedding {len(unique_index)} unique texts for {len(documents)} chunks in batch."
+    )
+    unique_embeddings = np.asarray(vector_db_client.embed_documents(list(unique_index)))
+    return unique_embeddings[inverse]
+
+
+def _ingest_batches(
+    vector_db_client,
+    batches: Iterator[Tuple[List[str], List[Dict[str, Any]], List[str]]],
+    batch_size: int,
+    concurrent_batches: int,
+    concurrent_adds: int,
+) -> int:
+    """
+    Producer/consumer ingestion: this thread reads, cleans and chunks articles into a
+    bounded queue of length-sorted super-batches while `concurrent_batches` threads embed
+    each one, and `concurrent_adds` threads add the embedded `batch_size` slices to the
+    vector DB. Tokenization, embedding and the (network-bound) adds all overlap, and
+    several add requests keep the server's write path busy. Returns the number of chunks
+    ingested. A failed batch is logged and skipped, as before; an error that kills a
+    consumer thread stops the producer and is re-raised here.
+    """
+    batch_queue: "queue.Queue" = queue.Queue(maxsize=_INGEST_QUEUE_SIZE)
+    consumer_failed = threading.Event()
+    # Embedded slices waiting for or running an add (bounds memory if the DB is slow)
+    add_slots = threading.BoundedSemaphore(concurrent_adds * 2)
+    progress_lock = threading.Lock()
+    total_chunks_ingested = 0
+
+    def add_slice(batch_documents, batch_metadatas, batch_ids, batch_embeddings) -> None:
+        nonlocal total_chunks_ingested
+        try:
+            vector_db_client.add_documents(
+                documents=batch_documents,
+                metadatas=batch_metadatas,
+                ids=batch_ids,
+                embeddings=batch_embeddings,
+            )
+            with progress_lock:
+                total_chunks_ingested += len(batch_documents)
+                total_so_far = total_chunks_ingested
+            logger.info(
+                f"Ingested batch of {len(batch_documents)} chunks. Total ingested: {total_so_far}"
+            )
+        except Exception as e:
+            logger.error(f"Failed to ingest batch: {e}", exc_info=True)
+            # Decide on error handling: skip batch, retry, or abort.
+        finally:
+            add_slots.release()
+
+    def consume() -> None:
+        try:
+            consume_batches()
+        except BaseException:
+            consumer_failed.set()  # Tells the producer to stop feeding the queue
+            raise
+
+    def consume_batches() -> None:
+        while True:
+            batch = batch_queue.get()
+            if batch is None:  # Sentinel: the producer is done
+                return
+            super_documents, super_metadatas, super_ids = batch
+            try:
+                # Embed here with the client's already-loaded SentenceTransformer (one
+                # encode() call over the whole length-sorted super-batch: normalized,
+                # FP16 on GPU) and hand the vectors over, so the vector DB never re-embeds.
+                super_embeddings = _embed_unique(vector_db_client, super_documents)
+            except Exception as e:
+                logger.error(
+                    f"Failed to embed batch of {len(super_documents)} chunks: {e}",
+                    exc_info=True,
+                )
+                continue
+
+            # Hand the slices to the add threads and go on embedding the next super-batch
+            for start in range(0, len(super_documents), batch_size):
+                add_slots.acquire()
+                add_executor.submit(
+                    add_slice,
+                    super_documents[start : start + batch_size],
+                    super_metadatas[start : start + batch_size],
+                    super_ids[start : start + batch_size],
+                    super_embeddings[start : start + batch_size],
+                )
+
+    # Leaving the block waits for the consumers first, then for their pending adds
+    with ThreadPoolExecutor(max_workers=concurrent_adds) as add_executor, ThreadPoolExecutor(
+        max_workers=concurrent_batches
+    ) as executor:
+        consumers = [executor.submit(consume) for _ in range(concurrent_batches)]
+
+        def enqueue(item) -> bool:
+            """
+            Puts item on the queue, waiting while the consumers are behind. Returns False
+            (item dropped) once no consumer is left to take it, instead of blocking forever.
+            """
+            while True:
+                try:
+                    batch_queue.put(item, timeout=_INGEST_QUEUE_PUT_TIMEOUT_SECONDS)
+                    return True
+                except queue.Full:
+                    if all(future.done() for future in consumers):
+                        return False
+
+        try:
+            for batch in batches:
+                if consumer_failed.is_set() or not enqueue(batch):
+                    break  # The consumer's error is re-raised below
+        finally:
+            # Drain cleanly: every consumer finishes the queued batches, then stops
+            for _ in consumers:
+                enqueue(None)
+        for future in as_completed(consumers):
+            future.result()  # Re-raise anything unexpected from a consumer thread
+
+    return total_chunks_ingested
+
+
+def _configure_torch_threads():
+    """
+    Pins torch's CPU thread pools for embedding. Left alone, some installs run on one
+    thread and others oversubscribe the cores (with MKL/OpenMP, set OMP_NUM_THREADS to match).
+    """
+    num_threads = settings.INGEST_TORCH_THREADS or max(1, (os.cpu_count() or 2) // 2)
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(2)
+    except RuntimeError:  # Only settable before any inter-op work has started
+        pass
+    logger.info(f"Embedding with {num_threads} torch threads.")
+
+
+def run_ingestion(
+    batch_size: int = 1000,
+    article_limit: Optional[int] = None,
+    concurrent_batches: int = 2,
+    split_workers: int = 1,
+    concurrent_adds: int = 4,
+    cache_chunks: Optional[str] = None,
+):
     logger.info("Starting data ingestion process...")
+    _configure_torch_threads()
 
     vector_db_client = None
     try:
-        vector_db_client = VectorDBClient(
-            host=settings.CHROMA_HOST,
-            port=settings.CHROMA_PORT,
-            collection_name=settings.CHROMA_COLLECTION_NAME,
-            embedding_model_name=settings.EMBEDDING_MODEL_NAME,  # EF used by client
-        )
+        vector_db_client = create_vector_db_client()
         if not vector_db_client.is_healthy():
             logger.error("VectorDB client is not healthy. Aborting ingestion.")
             return
@@ -217,58 +657,49 @@ def run_ingestion(batch_size: int = 100, article_limit: Optional[int] = None):
         )
         return
 
-    text_splitter = SimpleTokenTextSplitter(
-        model_name=settings.EMBEDDING_MODEL_NAME,  # Use the same model for token counting
+    cache_params = _chunk_cache_params(
+        dataset_name=settings.DATASET_NAME,
+        article_limit=article_limit,
+        model_name=settings.EMBEDDING_MODEL_NAME,
         chunk_size=settings.CHUNK_SIZE,
         chunk_overlap=settings.CHUNK_OVERLAP,
     )
-
-    chunk_iterator = load_and_chunk_data(
-        dataset_name=settings.DATASET_NAME,
-        text_splitter=text_splitter,
-        limit=article_limit,  # For testing, process a limited number of articles
-    )
-
-    batch_documents: List[str] = []
-    batch_metadatas: List[Dict[str, Any]] = []
-    batch_ids: List[str] = []
-    total_chunks_ingested = 0
-
-    for chunk_data in chunk_iterator:
-        batch_documents.append(chunk_data["text"])
-        batch_metadatas.append(chunk_data["metadata"])
-        batch_ids.append(chunk_data["id"])
-
-        if len(batch_documents) >= batch_size:
-            try:
-                vector_db_client.add_documents(
-                    documents=batch_documents, metadatas=batch_metadatas, ids=batch_ids
-                )
-                total_chunks_ingested += len(batch_documents)
-                logger.info(
-                    f"Ingested batch of {len(batch_documents)} chunks. Total ingested: {total_chunks_ingested}"
-                )
-            except Exception as e:
-                logger.error(f"Failed to ingest batch: {e}", exc_info=True)
-                # Decide on error handling: skip batch, retry, or abort.
-            finally:
-                batch_documents, batch_metadatas, batch_ids = [], [], []  # Clear batch
-
-    # Ingest any remaining chunks in the last batch
-    if batch_documents:
-        try:
-            vector_db_client.add_documents(
-                documents=batch_documents, metadatas=batch_metadatas, ids=batch_ids
-            )
-            total_chunks_ingested += len(batch_documents)
+    if cache_chunks and _chunk_cache_matches(cache_chunks, cache_params):
+        # Chunks from an earlier run with the same settings: no download, no tokenization
+        logger.info(f"Reading chunks from cache {cache_chunks}.")
+        chunk_iterator = _read_chunk_cache(cache_chunks)
+    else:
+        if cache_chunks and os.path.exists(cache_chunks):
             logger.info(
-                f"Ingested final batch of {len(batch_documents)} chunks. Total ingested: {total_chunks_ingested}"
+                f"Chunk cache {cache_chunks} was written with other settings; regenerating it."
             )
-        except Exception as e:
-            logger.error(f"Failed to ingest final batch: {e}", exc_info=True)
-        finally:
-            batch_documents, batch_metadatas, batch_ids = [], [], []
+        text_splitter = SimpleTokenTextSplitter(
+            model_name=settings.EMBEDDING_MODEL_NAME,  # Use the same model for token counting
+            chunk_size=settings.CHUNK_SIZE,
+            chunk_overlap=settings.CHUNK_OVERLAP,
+        )
 
+        chunk_iterator = load_and_chunk_data(
+            dataset_name=settings.DATASET_NAME,
+            text_splitter=text_splitter,
+            limit=article_limit,  # For testing, process a limited number of articles
+            split_workers=split_workers,
+        )
+        if cache_chunks:
+            chunk_iterator = _write_chunk_cache(chunk_iterator, cache_chunks, cache_params)
+
+    try:
+        total_chunks_ingested = _ingest_batches(
+            vector_db_client,
+            _batch_chunks(chunk_iterator, batch_size * _SMART_BATCH_FACTOR),
+            batch_size=batch_size,
+            concurrent_batches=max(1, concurrent_batches),
+            concurrent_adds=max(1, concurrent_adds),
+        )
+    finally:
+        # Persist in-process indexes (no-op for Chroma), also when the run failed part
+        # way: the batches added so far are already in the SQLite store.
+        vector_db_client.flush()
     final_count = vector_db_client.get_collection_count()
     logger.info(
         f"Data ingestion process completed. Total chunks ingested in this run: {total_chunks_ingested}."
@@ -278,25 +709,70 @@ def run_ingestion(batch_size: int = 100, article_limit: Optional[int] = None):
     )
 
 
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ingest the dataset into the vector DB.")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Chunks per add_documents call (larger batches amortize per-call overhead).",
+    )
+    parser.add_argument(
+        "--article-limit",
+        type=int,
+        default=10,
+        help="Process only the first N articles (quick test run); 0 processes all.",
+    )
+    parser.add_argument(
+        "--concurrent-batches",
+        type=int,
+        default=2,
+        help="Batches embedded concurrently while the next ones are prepared.",
+    )
+    parser.add_argument(
+        "--concurrent-adds",
+        type=int,
+        default=4,
+        help="add_documents requests in flight to the vector DB at once.",
+    )
+    parser.add_argument(
+        "--cache-chunks",
+        metavar="PATH",
+        help=(
+            "Arrow IPC file of chunked articles: read it instead of downloading and "
+            "tokenizing if it was written with the same dataset, article limit and "
+            "chunking settings, otherwise (re)write it during this run."
+        ),
+    )
+    parser.add_argument(
+        "--split-workers",
+        type=int,
+        default=max((os.cpu_count() or 2) - 1, 1),
+        help="Processes that tokenize and chunk articles (1 chunks in this process).",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    # Example: Run ingestion with a limit of 10 articles for quick testing
-    # In production, you'd run without article_limit or with a much larger one.
+    # Example: Run ingestion with a limit of 10 articles for quick testing (the default)
+    # In production, run with --article-limit 0 to process the whole dataset.
     # The ingestion can be run using:
     # docker-compose run --rm ingestion (if CMD in Dockerfile.ingestion is this script)
     # or
-    # docker-compose run --rm ingestion python data_ingestion/ingest.py
+    # docker-compose run --rm ingestion python data_ingestion/ingest.py --article-limit 0
 
     # For local testing without Docker:
     # Ensure .env is loaded (done by config.py) and dependencies are installed.
     # Make sure ChromaDB server is running if connecting to it.
 
+    args = _parse_args()
     logger.info("Manual ingestion script execution started.")
-    # Set a small limit for articles to process during manual run for testing
-    # Set to None to process all articles from the dataset split.
-    test_article_limit = (
-        10  # Process first 10 articles from the dataset for a quick test
+    run_ingestion(
+        batch_size=args.batch_size,
+        article_limit=args.article_limit or None,
+        concurrent_batches=args.concurrent_batches,
+        split_workers=args.split_workers,
+        concurrent_adds=args.concurrent_adds,
+        cache_chunks=args.cache_chunks,
     )
-    # test_article_limit = None # Process all
-
-    run_ingestion(batch_size=50, article_limit=test_article_limit)
     logger.info("Manual ingestion script execution finished.")
@@ -0,0 +1,118 @@
+# tests/unit/test_ingest.py
+import re
+
+import pytest
+
+from data_ingestion import ingest
+from data_ingestion.ingest import (
+    SimpleTokenTextSplitter,
+    _chunk_cache_matches,
+    _chunk_cache_params,
+    _read_chunk_cache,
+    _write_chunk_cache,
+)
+
+
+class _WhitespaceTokenizer:
+    """Stands in for a fast tokenizer: one token per word, with its character offsets."""
+
+    is_fast = True
+
+    def __call__(self, texts, **kwargs):
+        return {
+            "offset_mapping": [
+                [(m.start(), m.end()) for m in re.finditer(r"\S+", text)] for text in texts
+            ]
+        }
+
+
+def _splitter(monkeypatch, chunk_size, chunk_overlap):
+    monkeypatch.setattr(ingest, "_get_fast_tokenizer", lambda model_name: _WhitespaceTokenizer())
+    return SimpleTokenTextSplitter("model", chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def _words(n):
+    return [f"w{i}" for i in range(n)]
+
+
+@pytest.mark.parametrize("text", ["", "   \n "])
+def test_split_text_empty(monkeypatch, text):
+    assert _splitter(monkeypatch, 4, 1).split_text(text, "doc", None) == []
+
+
+def test_split_text_shorter_than_chunk_size(monkeypatch):
+    chunks = _splitter(monkeypatch, 8, 2).split_text("  w0 w1  w2 ", "doc", None)
+    assert [c["text"] for c in chunks] == ["w0 w1  w2"]  # Source spacing kept, ends stripped
+    assert chunks[0]["metadata"]["chunk_length_tokens"] == 3
+
+
+@pytest.mark.parametrize(
+    "num_tokens, chunk_size, chunk_overlap, starts",
+    [
+        (0, 4, 2, []),
+        (3, 4, 2, [0]),
+        (8, 4, 2, [0, 2, 4]),  # Exact multiple of the step: no tail window inside the last one
+        (8, 4, 0, [0, 4]),
+        (9, 4, 2, [0, 2, 4, 6]),
+        (7, 3, 3, [0, 3, 6]),  # overlap >= chunk_size: windows don't overlap rather than stall
+        (7, 3, 5, [0, 3, 6]),
+    ],
+)
+def test_window_starts(monkeypatch, num_tokens, chunk_size, chunk_overlap, starts):
+    splitter = _splitter(monkeypatch, chunk_size, chunk_overlap)
+    assert list(splitter._window_starts(num_tokens)) == starts
+
+
+@pytest.mark.parametrize("chunk_size, chunk_overlap", [(4, 2), (4, 0), (5, 3), (3, 3), (3, 7)])
+def test_chunk_text_is_source_slice(monkeypatch, chunk_size, chunk_overlap):
+    words = _words(11)
+    text = " ".join(words)
+    splitter = _splitter(monkeypatch, chunk_size, chunk_overlap)
+    starts = list(splitter._window_starts(len(words)))
+
+    chunks = splitter.split_text(text, "doc", "https://example.org/doc")
+
+    assert len(chunks) == len(starts)
+    for index, (chunk, start) in enumerate(zip(chunks, starts)):
+        end = min(start + chunk_size, len(words))
+        assert chunk["id"] == f"doc_chunk_{index}"
+        assert chunk["text"] == " ".join(words[start:end])
+        assert chunk["metadata"]["chunk_length_tokens"] == end - start
+        assert chunk["metadata"]["original_text_length_tokens"] == len(words)
+    assert chunks[-1]["text"].endswith(words[-1])  # The last window reaches the end
+
+
+def _chunk(i):
+    return {
+        "id": f"doc_chunk_{i}",
+        "text": f"chunk text {i}",
+        "metadata": {
+            "document_id": "doc",
+            "source_url": "https://example.org/doc",
+            "original_text_length_tokens": 100,
+            "chunk_index": i,
+            "chunk_length_tokens": 3,
+        },
+    }
+
+
+def test_chunk_cache_round_trip(tmp_path):
+    path = str(tmp_path / "cache" / "chunks.arrow")
+    params = _chunk_cache_params("wikipedia", 10, "model", 256, 32)
+    chunks = [_chunk(i) for i in range(5)]
+
+    assert not _chunk_cache_matches(path, params)  # No file yet
+    assert list(_write_chunk_cache(iter(chunks), path, params)) == chunks  # Passes chunks through
+    assert _chunk_cache_matches(path, params)
+    assert list(_read_chunk_cache(path)) == chunks
+
+
+def test_chunk_cache_mismatch_on_other_settings(tmp_path):
+    path = str(tmp_path / "chunks.arrow")
+    params = _chunk_cache_params("wikipedia", 10, "model", 256, 32)
+    list(_write_chunk_cache(iter([_chunk(0)]), path, params))
+
+    assert not _chunk_cache_matches(path, _chunk_cache_params("wikipedia", None, "model", 256, 32))
+    assert not _chunk_cache_matches(path, _chunk_cache_params("other", 10, "model", 256, 32))
+    assert not _chunk_cache_matches(path, _chunk_cache_params("wikipedia", 10, "model", 512, 32))
+    assert not _chunk_cache_matches(path, _chunk_cache_params("wikipedia", 10, "model", 256, 0))
@@ -0,0 +1,66 @@
+# tests/unit/test_middleware.py
+import logging
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.api.middleware import BodySizeLimitMiddleware, RequestLoggingMiddleware
+
+_MAX_BODY_BYTES = 16
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    @app.get("/metrics")
+    def metrics():
+        return {}
+
+    @app.get("/api/v1/ping")
+    def ping():
+        return {"pong": True}
+
+    @app.post("/api/v1/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(RequestLoggingMiddleware)
+    app.add_middleware(BodySizeLimitMiddleware, max_body_bytes=_MAX_BODY_BYTES)
+    return app
+
+
+def test_request_logging_logs_api_requests(caplog):
+    caplog.set_level(logging.INFO, logger="app.api.middleware")
+    response = TestClient(_app()).get("/api/v1/ping")
+
+    assert response.status_code == 200
+    (record,) = caplog.records
+    assert record.request_path == "/api/v1/ping"
+    assert record.response_status_code == 200
+
+
+def test_request_logging_skips_health_and_metrics(caplog):
+    caplog.set_level(logging.INFO, logger="app.api.middleware")
+    client = TestClient(_app())
+
+    assert client.get("/health").status_code == 200
+    assert client.get("/metrics").status_code == 200
+    assert caplog.records == []
+
+
+def test_body_size_limit_rejects_large_content_length():
+    response = TestClient(_app()).post("/api/v1/echo", content=b"x" * (_MAX_BODY_BYTES + 1))
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body too large."}
+
+
+def test_body_size_limit_passes_body_within_limit():
+    response = TestClient(_app()).post("/api/v1/echo", content=b"x" * _MAX_BODY_BYTES)
+
+    assert response.status_code == 200
+    assert response.json() == {"size": _MAX_BODY_BYTES}
@@ -0,0 +1,210 @@
+# tests/unit/test_worker_logic.py
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.job import JobStatus
+from app.worker import tasks
+from app.worker.logic.embedding_cache import EmbeddingCache, embedding_key
+from app.worker.logic import _fusion_numba
+from app.worker.logic.query_cache import QueryCache, make_query_key
+from app.worker.logic.retrieval import HybridRetriever, Passage
+
+
+def test_query_cache_hit_and_miss():
+    cache = QueryCache(max_size=2, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.put("a", [1])
+    assert cache.get("a") == [1]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_query_cache_evicts_least_recently_used():
+    cache = QueryCache(max_size=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_query_cache_expires_entries():
+    cache = QueryCache(max_size=2, ttl_seconds=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_make_query_key_normalizes_question():
+    assert make_query_key("  How do I Log? ", 5) == make_query_key("how do i log?", 5)
+    assert make_query_key("q", 5) != make_query_key("q", 3)
+
+
+def test_embedding_cache_evicts_least_recently_used():
+    cache = EmbeddingCache(max_size=2)
+    cache.put(embedding_key("a"), [0.1])
+    cache.put(embedding_key("b"), [0.2])
+    cache.get(embedding_key("a"))
+    cache.put(embedding_key("c"), [0.3])
+    assert cache.get(embedding_key("b")) is None
+    assert cache.get(embedding_key("a")) == [0.1]
+    assert len(cache) == 2
+
+
+def test_embedding_key_only_strips_whitespace():
+    assert embedding_key("  what is a pile? ") == embedding_key("what is a pile?")
+    assert embedding_key("What") != embedding_key("what")
+
+
+def _ranked(*chunk_ids):
+    return [(chunk_id, 1.0, {"source": chunk_id}) for chunk_id in chunk_ids]
+
+
+_RRF_CASES = [
+    [_ranked("a", "b", "c"), _ranked("c", "d", "a")],
+    [_ranked("a", "b"), _ranked("b", "a")],  # Tied scores: first-seen chunk ranks first
+    [_ranked("a", "b", "c", "d", "e", "f", "g"), _ranked()],  # More candidates than top_k
+    [_ranked("x"), _ranked("y")],  # Fewer candidates than top_k
+    [_ranked(), _ranked()],
+    [_ranked(*(f"s{i}" for i in range(50))), _ranked(*(f"s{i}" for i in range(49, -1, -3)))],
+]
+
+
+@pytest.mark.parametrize("ranked_lists", _RRF_CASES)
+def test_rrf_fuse_numba_and_python_paths_agree(monkeypatch, ranked_lists):
+    retriever = object.__new__(HybridRetriever)  # _rrf_fuse only reads top_k
+    retriever.top_k = 5
+    monkeypatch.setattr(_fusion_numba, "_NUMBA_AVAILABLE", False)
+    expected = retriever._rrf_fuse(ranked_lists, k=60)
+
+    fused = _fusion_numba.rrf_topk(ranked_lists, 60, retriever.top_k)
+
+    assert [chunk_id for chunk_id, _, _ in fused] == [chunk_id for chunk_id, _, _ in expected]
+    assert [score for _, score, _ in fused] == pytest.approx([score for _, score, _ in expected])
+    assert [metadata for _, _, metadata in fused] == [metadata for _, _, metadata in expected]
+
+
+@pytest.mark.parametrize(
+    "retries, ceiling",
+    [(0, 60), (1, 120), (2, 240), (3, 480), (4, 600), (10, 600)],  # Doubles, then capped
+)
+def test_retry_countdown_backoff_and_jitter(monkeypatch, retries, ceiling):
+    task = SimpleNamespace(default_retry_delay=60, request=SimpleNamespace(retries=retries))
+    monkeypatch.setattr(tasks.random, "uniform", lambda low, high: (low, high))
+    assert tasks._retry_countdown(task) == (0, ceiling)
+
+    monkeypatch.undo()
+    for _ in range(100):
+        assert 0 <= tasks._retry_countdown(task) <= ceiling
+
+
+class _StubRetriever:
+    def retrieve_passages(self, question):
+        return [Passage("doc_chunk_0", "Piles carry loads.", 0.9, "doc", None, "vector")]
+
+
+class _StubAnswerGenerator:
+    def precompute_prefix(self):
+        return None
+
+    def generate_answer(self, question, passages, on_partial_answer=None, prefix_state=None):
+        on_partial_answer("Piles")
+        return "Piles carry loads."
+
+
+class _StubSession:
+    def __call__(self):
+        return self
+
+    def get(self, model, key):
+        return None  # Job not completed yet
+
+    def remove(self):
+        pass
+
+
+def test_process_question_task_completes_and_reports_partial_answer(monkeypatch):
+    db_updates = []
+    progress = []
+
+    def record_update(db, job_id, status, **kwargs):
+        db_updates.append((job_id, status, kwargs))
+
+    monkeypatch.setattr(tasks, "ScopedSession", _StubSession())
+    monkeypatch.setattr(
+        tasks, "init_worker_state", lambda: (_StubRetriever(), _StubAnswerGenerator())
+    )
+    monkeypatch.setattr(tasks, "update_job_in_db", record_update)
+    monkeypatch.setattr(tasks.settings, "LLM_STREAM_PARTIAL_ANSWERS", True)
+    monkeypatch.setattr(tasks.settings, "ANSWER_STREAM_PUBSUB_ENABLED", False)
+    monkeypatch.setattr(
+        tasks.process_question_task, "update_state", lambda **kwargs: progress.append(kwargs)
+    )
+
+    result = tasks.process_question_task.apply(args=("job-1", "What do piles do?")).get()
+
+    assert result["status"] == "COMPLETED"
+    assert progress == [
+        {"task_id": "job-1", "state": "PROGRESS", "meta": {"job_id": "job-1", "partial": "Piles"}}
+    ]
+    assert db_updates == [
+        (
+            "job-1",
+            JobStatus.COMPLETED,
+            {
+                "result_text": "Piles carry loads.",
+                "sources_metadata": [
+                    {"source_id": "doc", "chunk_id": "doc_chunk_0", "relevance_score": 0.9}
+                ],
+            },
+        )
+    ]
+
+
+class _FailingVectorDBClient:
+    def query_documents(self, query_text, top_k=5, query_embedding=None):
+        raise RuntimeError("vector DB unavailable")
+
+
+def test_process_question_task_search_failure_is_not_completed(monkeypatch):
+    db_updates = []
+
+    def record_update(db, job_id, status, **kwargs):
+        db_updates.append((job_id, status, kwargs))
+
+    retry_errors = []
+
+    def exhausted_retry(exc, countdown):  # As on the last attempt
+        retry_errors.append(exc)
+        return tasks.process_question_task.MaxRetriesExceededError()
+
+    retriever = HybridRetriever(_FailingVectorDBClient(), top_k=5)
+    monkeypatch.setattr(tasks, "ScopedSession", _StubSession())
+    monkeypatch.setattr(tasks, "init_worker_state", lambda: (retriever, _StubAnswerGenerator()))
+    monkeypatch.setattr(tasks, "update_job_in_db", record_update)
+    monkeypatch.setattr(tasks.process_question_task, "retry", exhausted_retry)
+
+    result = tasks.process_question_task.apply(args=("job-1", "What do piles do?")).get()
+
+    assert result["status"] == "FAILED"
+    assert [type(exc) for exc in retry_errors] == [ConnectionError]  # Went through retries
+    assert [status for _, status, _ in db_updates] == [JobStatus.FAILED]
+
+
+def test_retrieve_passages_batch_returns_error_per_failed_question():
+    class _FlakyVectorDBClient:
+        def query_documents(self, query_text, top_k=5, query_embedding=None):
+            if query_text == "bad":
+                raise RuntimeError("query failed")
+            return [] if query_text == "empty" else [("c0", 0.5, {"text": "t", "document_id": "d"})]
+
+    results = HybridRetriever(_FlakyVectorDBClient(), top_k=5).retrieve_passages_batch(
+        ["good", "bad", "empty"]
+    )
+
+    assert [p.chunk_id for p in results[0]] == ["c0"]
+    assert isinstance(results[1], ConnectionError)
+    assert results[2] == []